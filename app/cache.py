@@ -0,0 +1,162 @@
+import json
+import time
+from collections import OrderedDict
+from typing import Any, Hashable
+
+from app.config import settings
+
+
+class LRUCache:
+    """
+    Простой in-process LRU-кэш с TTL на запись. Не потокобезопасен, рассчитан
+    на использование из одного event loop
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 60):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+
+    def get(self, key: Hashable, default=None):
+        item = self._data.get(key)
+        if item is None:
+            self.misses += 1
+            return default
+        expires_at, value = item
+        if expires_at < time.monotonic():
+            del self._data[key]
+            self.misses += 1
+            return default
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: Hashable, value: Any, ttl: float = None):
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        self._data[key] = (expires_at, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def delete(self, key: Hashable):
+        self._data.pop(key, None)
+
+    def clear(self):
+        self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self) -> dict:
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+class CacheBackend:
+    """
+    Общее для всех воркеров хранилище кэша. Значения - уже сериализованные bytes
+    """
+
+    async def get(self, key: str) -> bytes | None:
+        raise NotImplementedError
+
+    async def set(self, key: str, value: bytes, ttl: float):
+        raise NotImplementedError
+
+    async def delete(self, *keys: str):
+        raise NotImplementedError
+
+
+class RedisCacheBackend(CacheBackend):
+
+    def __init__(self, url: str):
+        # redis нужен только при включённом общем кэше
+        from redis import asyncio as redis
+
+        self.client = redis.from_url(url)
+
+    async def get(self, key: str) -> bytes | None:
+        return await self.client.get(key)
+
+    async def set(self, key: str, value: bytes, ttl: float):
+        await self.client.set(key, value, ex=max(int(ttl), 1))
+
+    async def delete(self, *keys: str):
+        if keys:
+            await self.client.delete(*keys)
+
+
+def get_shared_backend() -> CacheBackend | None:
+    if not settings.CACHE_URL:
+        return None
+    if settings.CACHE_URL.startswith(("redis://", "rediss://", "unix://")):
+        return RedisCacheBackend(settings.CACHE_URL)
+    raise ValueError(f"Unsupported CACHE_URL: {settings.CACHE_URL}")
+
+
+shared_backend = get_shared_backend()
+
+
+class Cache:
+    """
+    Двухуровневый кэш: локальный LRUCache и, если настроен, общий backend.
+    Значения должны сериализоваться в JSON
+    """
+
+    def __init__(self, namespace: str, maxsize: int, ttl: float, backend: CacheBackend = None):
+        self.namespace = namespace
+        self.ttl = ttl
+        self.local = LRUCache(maxsize=maxsize, ttl=ttl)
+        self.backend = backend
+        self.hits = 0
+        self.misses = 0
+
+    def _key(self, key: Hashable) -> str:
+        return f"{self.namespace}:{key}"
+
+    async def get(self, key: Hashable, default=None, local: bool = True):
+        """
+        local=False при общем backend читает мимо локального LRU: для ключей, которые
+        меняют другие воркеры и чья устаревшая копия недопустима
+        """
+        local = local or self.backend is None
+        if local:
+            value = self.local.get(key)
+            if value is not None:
+                self.hits += 1
+                return value
+        if self.backend is not None:
+            raw = await self.backend.get(self._key(key))
+            if raw is not None:
+                value = json.loads(raw)
+                if local:
+                    self.local.set(key, value)
+                self.hits += 1
+                return value
+        self.misses += 1
+        return default
+
+    async def set(self, key: Hashable, value: Any, local: bool = True):
+        if local or self.backend is None:
+            self.local.set(key, value)
+        if self.backend is not None:
+            await self.backend.set(self._key(key), json.dumps(value).encode(), self.ttl)
+
+    async def delete(self, key: Hashable):
+        self.local.delete(key)
+        if self.backend is not None:
+            await self.backend.delete(self._key(key))
+
+    def stats(self) -> dict:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "shared": self.backend is not None,
+            "local": self.local.stats(),
+        }
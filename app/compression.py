@@ -0,0 +1,169 @@
+import gzip
+import zlib
+
+from starlette.datastructures import Headers, MutableHeaders
+
+from app.config import settings
+
+try:
+    import brotli
+except ImportError:  # brotli необязателен, без него отдаём только gzip
+    brotli = None
+
+COMPRESSIBLE_TYPES = (
+    "text/",
+    "application/json",
+    "application/x-ndjson",
+    "application/javascript",
+    "application/xml",
+    "image/svg+xml",
+)
+
+
+def available_encodings() -> tuple[str, ...]:
+    """
+    Поддерживаемые кодировки в порядке предпочтения
+    """
+    if brotli is not None and settings.COMPRESSION_BROTLI:
+        return "br", "gzip"
+    return ("gzip",)
+
+
+def choose_encoding(accept_encoding: str, encodings: tuple[str, ...] | None = None) -> str | None:
+    """
+    Первая из encodings, которую клиент принимает по Accept-Encoding (с учётом q=0)
+    """
+    accepted = {}
+    for part in accept_encoding.lower().split(","):
+        name, _, params = part.partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[name.strip()] = quality
+
+    for encoding in encodings if encodings is not None else available_encodings():
+        if accepted.get(encoding, accepted.get("*", 0.0)) > 0:
+            return encoding
+    return None
+
+
+def compress_body(body: bytes, encoding: str) -> bytes:
+    """
+    Сжатие готового тела целиком, например для записи в кэш
+    """
+    if encoding == "br":
+        return brotli.compress(body, quality=settings.COMPRESSION_BROTLI_LEVEL)
+    # mtime=0 - одинаковое тело даёт одинаковые байты
+    return gzip.compress(body, compresslevel=settings.COMPRESSION_GZIP_LEVEL, mtime=0)
+
+
+class _GzipCompressor:
+
+    def __init__(self):
+        self._compressor = zlib.compressobj(settings.COMPRESSION_GZIP_LEVEL, zlib.DEFLATED, zlib.MAX_WBITS | 16)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.compress(data)
+
+    def flush(self) -> bytes:
+        return self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        return self._compressor.flush()
+
+
+class _BrotliCompressor:
+
+    def __init__(self):
+        self._compressor = brotli.Compressor(quality=settings.COMPRESSION_BROTLI_LEVEL)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.process(data)
+
+    def flush(self) -> bytes:
+        return self._compressor.flush()
+
+    def finish(self) -> bytes:
+        return self._compressor.finish()
+
+
+def _compressible(status: int, headers: Headers) -> bool:
+    if status < 200 or status in (204, 304):
+        return False
+    if "content-encoding" in headers or "content-range" in headers:
+        return False
+    return headers.get("content-type", "").startswith(COMPRESSIBLE_TYPES)
+
+
+class CompressionMiddleware:
+    """
+    ASGI-middleware сжатия gzip/brotli. Тела меньше COMPRESSION_MIN_SIZE отдаются как есть,
+    потоковые ответы сжимаются по кускам со сбросом буфера, чтобы клиент получал
+    данные сразу. Уже сжатые ответы (с Content-Encoding, например из кэша каталога) не трогаются
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] == "HEAD":
+            await self.app(scope, receive, send)
+            return
+
+        encoding = choose_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        start_message = None
+        passthrough = False
+        compressor = None
+
+        async def send_compressed(message):
+            nonlocal start_message, passthrough, compressor
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(scope=message)
+                if not _compressible(message["status"], headers):
+                    passthrough = True
+                    await send(message)
+                    return
+                # Ответ зависит от Accept-Encoding, даже если именно этот клиент получит его без сжатия
+                headers.add_vary_header("Accept-Encoding")
+                if encoding is None:
+                    passthrough = True
+                    await send(message)
+                    return
+                start_message = message
+                return
+
+            if passthrough or message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            if compressor is None:
+                if not more_body and len(body) < settings.COMPRESSION_MIN_SIZE:
+                    passthrough = True
+                    await send(start_message)
+                    await send(message)
+                    return
+
+                compressor = _BrotliCompressor() if encoding == "br" else _GzipCompressor()
+                headers = MutableHeaders(scope=start_message)
+                headers["Content-Encoding"] = encoding
+                if not more_body:
+                    body = compressor.compress(body) + compressor.finish()
+                    headers["Content-Length"] = str(len(body))
+                    await send(start_message)
+                    await send({"type": "http.response.body", "body": body})
+                    return
+                # Длина потока заранее неизвестна
+                if "content-length" in headers:
+                    del headers["Content-Length"]
+                await send(start_message)
+
+            data = compressor.compress(body) + (compressor.flush() if more_body else compressor.finish())
+            await send({"type": "http.response.body", "body": data, "more_body": more_body})
+
+        await self.app(scope, receive, send_compressed)
@@ -10,6 +10,78 @@ class Settings(BaseSettings):
     KEY: str
     ALGORITHM: str
     TOKEN_EXPIRE: int
+    # Срок refresh-токена в минутах; access-токен живёт TOKEN_EXPIRE минут
+    REFRESH_TOKEN_EXPIRE: int = 60 * 24 * 14
+    # Подсчёт SQL-запросов на HTTP-запрос и поиск N+1
+    SQL_INSTRUMENTATION: bool = True
+    # Отдавать статистику клиенту в заголовке Server-Timing
+    SQL_SERVER_TIMING: bool = False
+    # Логировать статистику каждого запроса, а не только подозрения на N+1
+    SQL_LOG_REQUESTS: bool = False
+    # Сколько одинаковых запросов за HTTP-запрос считать подозрением на N+1
+    SQL_N_PLUS_ONE_THRESHOLD: int = 5
+    # HTTP-метрики и /metrics для Prometheus
+    METRICS_ENABLED: bool = True
+    # Сжатие ответов: gzip всегда, brotli - если установлен пакет brotli
+    COMPRESSION_ENABLED: bool = True
+    COMPRESSION_BROTLI: bool = True
+    COMPRESSION_MIN_SIZE: int = 1024
+    COMPRESSION_GZIP_LEVEL: int = 6
+    COMPRESSION_BROTLI_LEVEL: int = 4
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 30
+    DB_POOL_RECYCLE: int = 1800
+    DB_POOL_PRE_PING: bool = False
+    # Кэш подготовленных выражений asyncpg; 0 - отключить (нужно за pgbouncer в transaction-режиме)
+    DB_STATEMENT_CACHE_SIZE: int = 100
+    DB_PREPARED_STATEMENT_CACHE_SIZE: int = 100
+    # Пустая строка - оставить настройку сервера
+    DB_STATEMENT_TIMEOUT: str = ""
+    DB_APPLICATION_NAME: str = "flowers"
+    # redis://... для общего между воркерами кэша, пусто - только in-process
+    CACHE_URL: str = ""
+    COUNT_CACHE_TTL: int = 60
+    COUNT_CACHE_SIZE: int = 1024
+    USER_CACHE_TTL: int = 30
+    PRODUCT_CACHE_TTL: int = 60
+    PRODUCT_CACHE_SIZE: int = 10000
+    # Cache-Control для анонимных страниц каталога, пусто - не отдавать заголовок
+    PRODUCT_CACHE_CONTROL: str = "public, max-age=30, stale-while-revalidate=60"
+    PRODUCT_IMPORT_BATCH_SIZE: int = 5000
+    # Загруженные изображения продуктов и их уменьшенные копии
+    MEDIA_ROOT: str = "media"
+    MEDIA_URL: str = "/media"
+    IMAGE_MAX_UPLOAD_SIZE: int = 10 * 1024 * 1024
+    IMAGE_THUMB_SIZE: int = 240
+    IMAGE_MEDIUM_SIZE: int = 800
+    IMAGE_WORKERS: int = 2
+    USER_CACHE_SIZE: int = 10000
+    # Для read-only маршрутов брать пользователя прямо из claims токена, без БД и кэша
+    AUTH_TRUST_TOKEN_CLAIMS: bool = False
+    # Проверенные JWT кэшируются до exp; pyjwt - альтернативный декодер (нужен пакет PyJWT)
+    AUTH_TOKEN_CACHE_SIZE: int = 10000
+    AUTH_JWT_BACKEND: str = "jose"
+    # Сколько секунд версия токенов пользователя живёт в локальном кэше воркера
+    AUTH_TOKEN_VERSION_TTL: int = 30
+    # Где считать bcrypt: thread, process или inline (прямо в event loop)
+    AUTH_HASH_EXECUTOR: str = "thread"
+    AUTH_HASH_WORKERS: int = 4
+    # Одновременных логинов; сверх этого ждут в очереди, при переполнении - 503
+    AUTH_LOGIN_CONCURRENCY: int = 8
+    AUTH_LOGIN_QUEUE_SIZE: int = 32
+    AUTH_LOGIN_QUEUE_TIMEOUT: float = 5
+    # Лимит попыток входа и регистрации за RATE_LIMIT_WINDOW секунд (скользящее окно)
+    RATE_LIMIT_ENABLED: bool = True
+    RATE_LIMIT_WINDOW: int = 60
+    RATE_LIMIT_IP: int = 30
+    RATE_LIMIT_EMAIL: int = 10
+    # Сколько ключей держать в памяти; redis://... - общие счётчики для всех воркеров
+    RATE_LIMIT_SIZE: int = 100000
+    RATE_LIMIT_URL: str = ""
+    # Сколько доверенных прокси стоит перед приложением: IP клиента берётся из
+    # X-Forwarded-For на столько записей правее; 0 - заголовок игнорируется
+    RATE_LIMIT_TRUSTED_PROXIES: int = 0
     # MAIL_USERNAME: str
     # MAIL_PASSWORD: str
     # MAIL_FROM: str
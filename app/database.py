@@ -1,10 +1,19 @@
+import logging
+import time
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+
 import inflect
 from sqlalchemy import Integer
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
 from sqlalchemy.orm import sessionmaker, DeclarativeBase, Mapped, mapped_column, declared_attr
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 
 from app.config import settings
 
+logger = logging.getLogger(__name__)
+
 DB_USER = settings.DB_USER
 DB_PASS = settings.DB_PASS
 DB_HOST = settings.DB_HOST
@@ -12,7 +21,71 @@ DB_PORT = settings.DB_PORT
 DB_NAME = settings.DB_NAME
 
 DATABASE_URL = f"postgresql+asyncpg://{DB_USER}:{DB_PASS}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
-engine = create_async_engine(DATABASE_URL)
+
+
+class PoolWaitStats:
+    """
+    Сколько запросы ждали свободное подключение из пула
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.timeouts = 0
+
+    def record(self, seconds: float):
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+    def as_dict(self) -> dict:
+        return {
+            "count": self.count,
+            "timeouts": self.timeouts,
+            "total_seconds": round(self.total, 6),
+            "avg_seconds": round(self.total / self.count, 6) if self.count else 0.0,
+            "max_seconds": round(self.max, 6),
+        }
+
+
+pool_wait_stats = PoolWaitStats()
+
+
+class TimedQueuePool(AsyncAdaptedQueuePool):
+    """
+    Обычный асинхронный QueuePool, который замеряет время получения подключения
+    """
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            pool_wait_stats.timeouts += 1
+            raise
+        finally:
+            pool_wait_stats.record(time.perf_counter() - started)
+
+
+server_settings = {"application_name": settings.DB_APPLICATION_NAME}
+if settings.DB_STATEMENT_TIMEOUT:
+    server_settings["statement_timeout"] = settings.DB_STATEMENT_TIMEOUT
+
+engine = create_async_engine(
+    DATABASE_URL,
+    poolclass=TimedQueuePool,
+    pool_size=settings.DB_POOL_SIZE,
+    max_overflow=settings.DB_MAX_OVERFLOW,
+    pool_timeout=settings.DB_POOL_TIMEOUT,
+    pool_recycle=settings.DB_POOL_RECYCLE,
+    pool_pre_ping=settings.DB_POOL_PRE_PING,
+    connect_args={
+        "statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE,
+        "prepared_statement_cache_size": settings.DB_PREPARED_STATEMENT_CACHE_SIZE,
+        "server_settings": server_settings,
+    },
+)
 
 async_session = sessionmaker(
     bind=engine, class_=AsyncSession, expire_on_commit=False
@@ -20,8 +93,62 @@ async_session = sessionmaker(
 
 p = inflect.engine()
 
+# Сессия текущего HTTP-запроса, её подхватывают репозитории
+request_session: ContextVar[AsyncSession | None] = ContextVar("request_session", default=None)
+
+
+def get_pool_status() -> dict:
+    pool = engine.pool
+    return {
+        "size": pool.size(),
+        "checked_out": pool.checkedout(),
+        "idle": pool.checkedin(),
+        "overflow": max(pool.overflow(), 0),
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "wait": pool_wait_stats.as_dict(),
+    }
+
 
 async def get_session() -> AsyncSession:
+    """
+    Одна сессия и одна транзакция на запрос: коммит после успешного обработчика,
+    откат при любом исключении
+    """
+    async with async_session() as session:
+        token = request_session.set(session)
+        try:
+            yield session
+            await session.commit()
+        except Exception:
+            await session.rollback()
+            raise
+        finally:
+            request_session.reset(token)
+        # Данные уже закоммичены: сбой сброса кэша не должен превращать ответ в 500
+        for callback in session.info.pop("after_commit", []):
+            try:
+                await callback()
+            except Exception:
+                logger.exception("After-commit callback %r failed", callback)
+
+
+def after_commit(session: AsyncSession, callback):
+    """
+    Выполнить async callback после коммита сессии запроса (например, сбросить кэш,
+    чтобы параллельный запрос не положил туда ещё не закоммиченные данные)
+    """
+    session.info.setdefault("after_commit", []).append(callback)
+
+
+@asynccontextmanager
+async def use_session(session: AsyncSession = None):
+    """
+    Переданная сессия или сессия текущего запроса; вне запроса открывает новую
+    """
+    session = session or request_session.get()
+    if session is not None:
+        yield session
+        return
     async with async_session() as session:
         yield session
 
@@ -0,0 +1,93 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from app.database import get_pool_status, pool_wait_stats
+from app.metrics import CallbackMetric, registry
+from app.product.cache import product_cache
+from app.repository.base import count_cache
+from app.user import auth
+from app.user.cache import user_cache
+from app.user.tokens import verified_tokens
+
+router = APIRouter(
+    prefix="/app/health",
+    tags=["Health"],
+)
+metrics_router = APIRouter(tags=["Health"])
+
+CACHES = {
+    "user": user_cache,
+    "product": product_cache,
+    "count": count_cache,
+    "token": verified_tokens,
+}
+
+
+def _pool_samples():
+    status = get_pool_status()
+    return [((state,), status[state]) for state in ("checked_out", "idle", "overflow")]
+
+
+def _cache_samples(attribute: str):
+    return lambda: [((name,), getattr(cache, attribute)) for name, cache in CACHES.items()]
+
+
+registry.register(CallbackMetric(
+    "db_pool_connections", "Database pool connections by state", _pool_samples, ("state",)
+))
+registry.register(CallbackMetric(
+    "db_pool_size", "Configured database pool size", lambda: [((), get_pool_status()["size"])]
+))
+registry.register(CallbackMetric(
+    "db_pool_waits_total", "Pool checkouts with measured wait time",
+    lambda: [((), pool_wait_stats.count)], type="counter"
+))
+registry.register(CallbackMetric(
+    "db_pool_wait_seconds_total", "Time spent waiting for a pool connection",
+    lambda: [((), pool_wait_stats.total)], type="counter"
+))
+registry.register(CallbackMetric(
+    "db_pool_timeouts_total", "Pool checkouts that timed out",
+    lambda: [((), pool_wait_stats.timeouts)], type="counter"
+))
+registry.register(CallbackMetric(
+    "cache_hits_total", "Cache hits", _cache_samples("hits"), ("cache",), type="counter"
+))
+registry.register(CallbackMetric(
+    "cache_misses_total", "Cache misses", _cache_samples("misses"), ("cache",), type="counter"
+))
+registry.register(CallbackMetric(
+    "bcrypt_queue_depth", "Password hashing jobs waiting or running in the worker pool",
+    lambda: [((), auth.hash_queue_depth)]
+))
+
+
+@router.get("/pool")
+async def pool_health():
+    """
+    Состояние пула подключений к БД: занятые, свободные, overflow и время ожидания
+    """
+    return get_pool_status()
+
+
+@router.get("/cache")
+async def cache_health():
+    """
+    Счётчики попаданий и промахов кэшей приложения
+    """
+    return {
+        "user": user_cache.stats(),
+        "product": product_cache.stats(),
+        "count": count_cache.stats(),
+        "token": verified_tokens.stats(),
+    }
+
+
+@metrics_router.get("/metrics", response_class=PlainTextResponse)
+async def prometheus_metrics():
+    """
+    Метрики в текстовом формате Prometheus
+    """
+    return PlainTextResponse(
+        registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
@@ -0,0 +1,148 @@
+import json
+import logging
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from sqlalchemy import event
+from starlette.datastructures import MutableHeaders
+
+from app.config import settings
+from app.database import engine
+
+logger = logging.getLogger("app.sql")
+
+
+class RequestStats:
+    """
+    SQL-статистика одного HTTP-запроса
+    """
+
+    def __init__(self):
+        self.statements = 0
+        self.db_time = 0.0
+        self.checkouts = 0
+        self.statement_counts: Counter[str] = Counter()
+
+    def n_plus_one_suspects(self) -> list[tuple[str, int]]:
+        return [
+            (statement, count)
+            for statement, count in self.statement_counts.most_common()
+            if count >= settings.SQL_N_PLUS_ONE_THRESHOLD
+        ]
+
+    def server_timing(self, total: float) -> str:
+        return (
+            f"db;dur={self.db_time * 1000:.2f}, "
+            f"db-statements;desc={self.statements}, "
+            f"db-checkouts;desc={self.checkouts}, "
+            f"total;dur={total * 1000:.2f}"
+        )
+
+
+request_stats: ContextVar[RequestStats | None] = ContextVar("request_stats", default=None)
+# Активные statement_budget: каждый получает текст всех выполненных запросов
+_recorders: list[list[str]] = []
+
+
+@event.listens_for(engine.sync_engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+
+@event.listens_for(engine.sync_engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_started"].pop()
+    stats = request_stats.get()
+    if stats is not None:
+        stats.statements += 1
+        stats.db_time += elapsed
+        stats.statement_counts[statement] += 1
+    for recorded in _recorders:
+        recorded.append(statement)
+
+
+@event.listens_for(engine.sync_engine, "checkout")
+def _checkout(dbapi_connection, connection_record, connection_proxy):
+    stats = request_stats.get()
+    if stats is not None:
+        stats.checkouts += 1
+
+
+class SQLInstrumentationMiddleware:
+    """
+    ASGI-middleware: считает запросы к БД, время в БД и взятые из пула подключения
+    за HTTP-запрос, пишет их в Server-Timing и лог, предупреждает о N+1
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = request_stats.set(stats)
+        started = time.perf_counter()
+        status_code = 500
+
+        async def send_with_timing(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                if settings.SQL_SERVER_TIMING:
+                    headers = MutableHeaders(scope=message)
+                    headers.append("Server-Timing", stats.server_timing(time.perf_counter() - started))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            request_stats.reset(token)
+            self._log(scope, stats, status_code, time.perf_counter() - started)
+
+    @staticmethod
+    def _log(scope, stats: RequestStats, status_code: int, total: float):
+        suspects = stats.n_plus_one_suspects()
+        if not suspects and not settings.SQL_LOG_REQUESTS:
+            return
+        record = {
+            "method": scope["method"],
+            "path": scope["path"],
+            "status": status_code,
+            "statements": stats.statements,
+            "db_ms": round(stats.db_time * 1000, 2),
+            "checkouts": stats.checkouts,
+            "total_ms": round(total * 1000, 2),
+        }
+        if suspects:
+            record["n_plus_one"] = [
+                {"statement": statement[:200], "count": count} for statement, count in suspects
+            ]
+            logger.warning(json.dumps(record, ensure_ascii=False))
+        else:
+            logger.info(json.dumps(record, ensure_ascii=False))
+
+
+@contextmanager
+def statement_budget(max_statements: int):
+    """
+    Для тестов: AssertionError, если внутри блока выполнено больше max_statements запросов.
+
+        with statement_budget(4):
+            await client.post("/app/basket/items", json=...)
+    """
+    recorded: list[str] = []
+    _recorders.append(recorded)
+    try:
+        yield recorded
+    finally:
+        _recorders.remove(recorded)
+    if len(recorded) > max_statements:
+        listing = "\n".join(f"  {statement}" for statement in recorded)
+        raise AssertionError(
+            f"Expected at most {max_statements} SQL statements, got {len(recorded)}:\n{listing}"
+        )
@@ -1,45 +1,91 @@
 from fastapi import APIRouter, Request, Depends, Form
-from fastapi.templating import Jinja2Templates
 from fastapi.responses import RedirectResponse
+from pydantic import EmailStr, TypeAdapter, ValidationError
 from sqlalchemy.ext.asyncio import AsyncSession
-from crud import create_customer
-from main import authenticate_user, create_access_token
-from database import get_db
-from datetime import timedelta
+
+from app.database import get_session
+from app.jinja.templates import templates
+from app.ratelimit import rate_limit
+from app.user.auth import REFRESH_COOKIE_PATH, get_hashed_password_async, verify_password_async, issue_tokens
+from app.user.dependencies import get_optional_user, login_slot
+from app.user.repository import UserRepository
+from app.user.revocation import revoke_user_tokens_on_commit
+from app.user.schemas import SAuthUser
 
 router = APIRouter()
-templates = Jinja2Templates(directory="template")
 
-ACCESS_TOKEN_EXPIRE_MINUTES = 30
+email_adapter = TypeAdapter(EmailStr)
+
+
+def login_redirect(user) -> RedirectResponse:
+    """
+    Те же cookie, что ставит /user/login, поэтому страницы и API используют одну сессию
+    """
+    response = RedirectResponse("/", status_code=302)
+    issue_tokens(response, user.id, user.token_version, name=user.name, email=user.email)
+    return response
+
 
 @router.get("/register")
 def get_register_page(request: Request):
-    return templates.TemplateResponse("register.html", {"request": request})
-
-
-@router.post("/register")
-async def register_user(request: Request, name: str = Form(...), email: str = Form(...),
-                        password: str = Form(...), db: AsyncSession = Depends(get_db)):
-    customer_data = {
-        "name": name,
-        "mail": email,
-        "password": password
-    }
-    await create_customer(db, customer_data)
-    return RedirectResponse("/login", status_code=302)
+    return templates.TemplateResponse(request, "register.html")
+
+
+@router.post("/register", dependencies=[Depends(rate_limit("register")), Depends(login_slot)])
+async def register_user(
+    request: Request,
+    name: str = Form(...),
+    email: str = Form(...),
+    password: str = Form(...),
+    session: AsyncSession = Depends(get_session)
+):
+    try:
+        email = email_adapter.validate_python(email)
+    except ValidationError:
+        return templates.TemplateResponse(request, "register.html", {"error": "Invalid email"}, status_code=400)
+
+    if await UserRepository.get_by(session=session, email=email):
+        return templates.TemplateResponse(
+            request, "register.html", {"error": "Email already registered"}, status_code=400
+        )
+
+    user = await UserRepository.create(
+        session=session,
+        name=name,
+        email=email,
+        hashed_password=await get_hashed_password_async(password),
+    )
+    return login_redirect(user)
+
+
 @router.get("/login")
 def get_login_page(request: Request):
-    return templates.TemplateResponse("login.html", {"request": request})
+    return templates.TemplateResponse(request, "login.html")
+
+
+@router.post("/login", dependencies=[Depends(rate_limit("login")), Depends(login_slot)])
+async def login_user(
+    request: Request,
+    email: str = Form(...),
+    password: str = Form(...),
+    session: AsyncSession = Depends(get_session)
+):
+    user = await UserRepository.get_by(session=session, email=email)
+    if user is None or not await verify_password_async(password, user.hashed_password):
+        return templates.TemplateResponse(request, "login.html", {"error": "Invalid credentials"}, status_code=400)
+    return login_redirect(user)
 
-@router.post("/login")
-async def login_user(request: Request, email: str = Form(...), password: str = Form(...),
-                     db: AsyncSession = Depends(get_db)):
-    user = await authenticate_user(db, email, password)
-    if not user:
-        return templates.TemplateResponse("login.html", {"request": request, "error": "Invalid credentials"})
 
-    access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-    access_token = create_access_token(data={"sub": user.mail}, expires_delta=access_token_expires)
+@router.get("/logout")
+async def logout_user(
+    session: AsyncSession = Depends(get_session),
+    user: SAuthUser | None = Depends(get_optional_user)
+):
+    if user is not None:
+        version = await UserRepository.bump_token_version(user.id, session=session)
+        if version is not None:
+            revoke_user_tokens_on_commit(session, user.id, version)
     response = RedirectResponse("/", status_code=302)
-    response.set_cookie(key="access_token", value=f"Bearer {access_token}", httponly=True)
+    response.delete_cookie("token")
+    response.delete_cookie("refresh_token", path=REFRESH_COOKIE_PATH)
     return response
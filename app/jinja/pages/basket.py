@@ -1,21 +1,31 @@
 from fastapi import APIRouter, Request, Depends
-from fastapi.templating import Jinja2Templates
-from fastapi.responses import RedirectResponse
+from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
-from main import get_current_user
-from database import get_db
-from crud import get_active_basket, get_basket_items
+from sqlalchemy.orm import selectinload
+
+from app.database import get_session
+from app.jinja.templates import templates
+from app.product.models import Basket, BasketItem
+from app.user.dependencies import get_optional_user
+from app.user.schemas import SAuthUser
 
 router = APIRouter()
-templates = Jinja2Templates(directory="template")
 
 
 @router.get("/basket")
-async def get_basket_page(request: Request, db: AsyncSession = Depends(get_db), token: str = Depends(get_current_user)):
-    if not token:
-        return templates.TemplateResponse("not_registered.html", {"request": request})
+async def get_basket_page(
+    request: Request,
+    session: AsyncSession = Depends(get_session),
+    user: SAuthUser | None = Depends(get_optional_user)
+):
+    if not user:
+        return templates.TemplateResponse(request, "not_registered.html")
 
-    basket = await get_active_basket(db, token.id)
-    items = await get_basket_items(db, basket.id) if basket else []
+    query = select(Basket).options(
+        selectinload(Basket.basket_items).selectinload(BasketItem.product)
+    ).filter(Basket.user_id == user.id, Basket.active_status == True)
+    result = await session.execute(query)
+    basket = result.scalar_one_or_none()
+    items = basket.basket_items if basket else []
 
-    return templates.TemplateResponse("basket.html", {"request": request, "basket": basket, "items": items})
+    return templates.TemplateResponse(request, "basket.html", {"basket": basket, "items": items})
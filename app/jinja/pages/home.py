@@ -1,16 +1,45 @@
-from fastapi import APIRouter, Request, Depends
-from fastapi.templating import Jinja2Templates
-from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import Session
-from database import get_db
-from crud import get_products
-from main import get_current_user
+from fastapi import APIRouter, Request, Depends, Query
+from markupsafe import Markup
+
+from app.jinja.templates import templates
+from app.product.cache import product_cache, get_catalog_version
+from app.product.repository import ProductRepository
+from app.product.schemas import SRProduct
+from app.user.dependencies import get_optional_user
+from app.user.schemas import SAuthUser
 
 router = APIRouter()
 
-templates = Jinja2Templates(directory="template")
+PAGE_SIZE = 24
+
+
+async def product_list_fragment(page: int) -> str:
+    """
+    HTML списка продуктов для страницы каталога. Кэшируется по версии каталога,
+    которую сбрасывает любое изменение продуктов, так что повторные просмотры не ходят в БД
+    """
+    version = await get_catalog_version()
+    cache_key = f"fragment:home:{version}:{page}"
+    fragment = await product_cache.get(cache_key)
+    if fragment is None:
+        # Одна лишняя строка показывает, есть ли следующая страница, без COUNT
+        rows = await ProductRepository.paginate(page=page, limit=PAGE_SIZE + 1)
+        products = [SRProduct.model_validate(product) for product in rows[:PAGE_SIZE]]
+        fragment = templates.get_template("_product_list.html").render(
+            products=products, page=page, has_next=len(rows) > PAGE_SIZE
+        )
+        await product_cache.set(cache_key, fragment)
+    return fragment
+
 
+@router.get("/")
 @router.get("/home")
-async def home(request: Request, db: AsyncSession = Depends(get_db)):
-    products = await get_products(db)
-    return templates.TemplateResponse("home.html", {"request": request, "products": products})
+async def home(
+    request: Request,
+    page: int = Query(1, ge=1),
+    user: SAuthUser | None = Depends(get_optional_user)
+):
+    products_html = Markup(await product_list_fragment(page))
+    return templates.TemplateResponse(
+        request, "home.html", {"products_html": products_html, "user": user}
+    )
@@ -1,15 +1,14 @@
 from fastapi import APIRouter, Request, Depends
-from fastapi.templating import Jinja2Templates
-from fastapi.responses import RedirectResponse
-from sqlalchemy.ext.asyncio import AsyncSession
-from main import get_current_user
-from database import get_db
+
+from app.jinja.templates import templates
+from app.user.dependencies import get_optional_user
+from app.user.schemas import SAuthUser
 
 router = APIRouter()
-templates = Jinja2Templates(directory="template")
+
 
 @router.get("/profile")
-async def get_profile_page(request: Request, db: AsyncSession = Depends(get_db), token: str = Depends(get_current_user)):
-    if not token:
-        return templates.TemplateResponse("not_registered.html", {"request": request})
-    return templates.TemplateResponse("profile.html", {"request": request, "user": token})
+async def get_profile_page(request: Request, user: SAuthUser | None = Depends(get_optional_user)):
+    if not user:
+        return templates.TemplateResponse(request, "not_registered.html")
+    return templates.TemplateResponse(request, "profile.html", {"user": user})
@@ -0,0 +1,15 @@
+from fastapi import APIRouter
+from fastapi.responses import HTMLResponse
+
+from app.jinja.pages.auth import router as auth_router
+from app.jinja.pages.basket import router as basket_router
+from app.jinja.pages.home import router as home_router
+from app.jinja.pages.profile import router as profile_router
+
+# HTML-страницы магазина; в OpenAPI их не показываем
+router = APIRouter(include_in_schema=False, default_response_class=HTMLResponse)
+
+router.include_router(home_router)
+router.include_router(auth_router)
+router.include_router(basket_router)
+router.include_router(profile_router)
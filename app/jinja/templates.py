@@ -0,0 +1,28 @@
+import os
+
+from fastapi.templating import Jinja2Templates
+from jinja2 import Environment, FileSystemLoader, select_autoescape
+
+BASE_DIR = os.path.dirname(__file__)
+TEMPLATE_DIR = os.path.join(BASE_DIR, "template")
+STATIC_DIR = os.path.join(BASE_DIR, "static")
+
+# Шаблоны не меняются во время работы: без auto_reload Jinja не проверяет mtime
+# файла на каждый рендер, cache_size=-1 - все скомпилированные шаблоны остаются в памяти
+environment = Environment(
+    loader=FileSystemLoader(TEMPLATE_DIR),
+    autoescape=select_autoescape(["html"]),
+    auto_reload=False,
+    cache_size=-1,
+)
+templates = Jinja2Templates(env=environment)
+
+
+def precompile_templates() -> int:
+    """
+    Компилирует все шаблоны при старте, чтобы первый запрос не платил за разбор
+    """
+    names = environment.list_templates(extensions=["html"])
+    for name in names:
+        environment.get_template(name)
+    return len(names)
@@ -1,8 +1,42 @@
+import os
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
+from fastapi.staticfiles import StaticFiles
+from app.compression import CompressionMiddleware
+from app.config import settings
+from app.health.routers import router as health_router, metrics_router
+from app.instrumentation import SQLInstrumentationMiddleware
+from app.jinja.routers import router as pages_router
+from app.jinja.templates import STATIC_DIR, precompile_templates
+from app.metrics import PrometheusMiddleware
+from app.product.images import MediaFiles
+from app.responses import ORJSONResponse
 from app.user.routers import router as user_router
 from app.product.routers import router as mini_router
 
-app = FastAPI()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    precompile_templates()
+    yield
+
+
+app = FastAPI(default_response_class=ORJSONResponse, lifespan=lifespan)
 
 app.include_router(user_router)
-app.include_router(mini_router)
\ No newline at end of file
+app.include_router(mini_router)
+app.include_router(health_router)
+app.include_router(metrics_router)
+app.include_router(pages_router)
+
+os.makedirs(settings.MEDIA_ROOT, exist_ok=True)
+app.mount(settings.MEDIA_URL, MediaFiles(directory=settings.MEDIA_ROOT), name="media")
+app.mount("/static", StaticFiles(directory=STATIC_DIR), name="static")
+
+if settings.COMPRESSION_ENABLED:
+    app.add_middleware(CompressionMiddleware)
+if settings.SQL_INSTRUMENTATION:
+    app.add_middleware(SQLInstrumentationMiddleware)
+if settings.METRICS_ENABLED:
+    app.add_middleware(PrometheusMiddleware)
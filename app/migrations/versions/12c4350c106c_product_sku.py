@@ -0,0 +1,28 @@
+"""product sku as natural key for import
+
+Revision ID: 12c4350c106c
+Revises: 23a4a79c28ee
+Create Date: 2026-10-17 13:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '12c4350c106c'
+down_revision: Union[str, None] = '23a4a79c28ee'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('products', sa.Column('sku', sa.String(), nullable=True))
+    op.create_unique_constraint('products_sku_key', 'products', ['sku'])
+
+
+def downgrade() -> None:
+    op.drop_constraint('products_sku_key', 'products', type_='unique')
+    op.drop_column('products', 'sku')
@@ -0,0 +1,57 @@
+"""product search: tsvector column, GIN and trigram indexes
+
+Revision ID: 23a4a79c28ee
+Revises: 4d8a1f3b6e25
+Create Date: 2026-10-17 12:30:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '23a4a79c28ee'
+down_revision: Union[str, None] = '4d8a1f3b6e25'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    op.add_column(
+        'products',
+        sa.Column(
+            'search_vector',
+            postgresql.TSVECTOR(),
+            sa.Computed(
+                "to_tsvector('simple', coalesce(name, '') || ' ' || coalesce(description, ''))",
+                persisted=True,
+            ),
+            nullable=True,
+        ),
+    )
+    # Индексы строим без блокировки записи в таблицу
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_products_search_vector', 'products', ['search_vector'],
+            postgresql_using='gin', postgresql_concurrently=True,
+        )
+        op.create_index(
+            'ix_products_name_trgm', 'products', ['name'],
+            postgresql_using='gin', postgresql_ops={'name': 'gin_trgm_ops'}, postgresql_concurrently=True,
+        )
+        op.create_index(
+            'ix_products_in_stock_price', 'products', ['price', 'id'],
+            postgresql_where=sa.text('quantity > 0'), postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_products_in_stock_price', table_name='products', postgresql_concurrently=True)
+        op.drop_index('ix_products_name_trgm', table_name='products', postgresql_concurrently=True)
+        op.drop_index('ix_products_search_vector', table_name='products', postgresql_concurrently=True)
+    op.drop_column('products', 'search_vector')
@@ -0,0 +1,31 @@
+"""product indexes for keyset pagination
+
+Revision ID: 3c9d2e7f1b60
+Revises: eb891431326a
+Create Date: 2026-10-17 12:05:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3c9d2e7f1b60'
+down_revision: Union[str, None] = 'eb891431326a'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Индексы строим без блокировки записи в таблицу
+    with op.get_context().autocommit_block():
+        op.create_index('ix_products_price_id', 'products', ['price', 'id'], postgresql_concurrently=True)
+        op.create_index('ix_products_name_id', 'products', ['name', 'id'], postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_products_name_id', table_name='products', postgresql_concurrently=True)
+        op.drop_index('ix_products_price_id', table_name='products', postgresql_concurrently=True)
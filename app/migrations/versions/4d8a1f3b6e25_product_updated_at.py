@@ -0,0 +1,29 @@
+"""product updated_at for Last-Modified
+
+Revision ID: 4d8a1f3b6e25
+Revises: 9e2f4a6c8d10
+Create Date: 2026-10-17 12:20:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4d8a1f3b6e25'
+down_revision: Union[str, None] = '9e2f4a6c8d10'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        'products',
+        sa.Column('updated_at', sa.DateTime(), server_default=sa.text('now()'), nullable=False),
+    )
+
+
+def downgrade() -> None:
+    op.drop_column('products', 'updated_at')
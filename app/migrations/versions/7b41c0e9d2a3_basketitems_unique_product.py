@@ -0,0 +1,50 @@
+"""one basket item per product
+
+Revision ID: 7b41c0e9d2a3
+Revises: 3c9d2e7f1b60
+Create Date: 2026-10-17 12:10:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7b41c0e9d2a3'
+down_revision: Union[str, None] = '3c9d2e7f1b60'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Повторы одного продукта в корзине сливаем в самую раннюю строку, количество складываем.
+    # Сумма корзины не меняется: позиции остаются те же
+    op.execute(
+        """
+        UPDATE basketitems SET quantity = duplicates.quantity
+        FROM (
+            SELECT min(id) AS id, sum(quantity) AS quantity
+            FROM basketitems
+            WHERE product_id IS NOT NULL
+            GROUP BY basket_id, product_id
+            HAVING count(*) > 1
+        ) AS duplicates
+        WHERE basketitems.id = duplicates.id
+        """
+    )
+    op.execute(
+        """
+        DELETE FROM basketitems
+        USING basketitems AS kept
+        WHERE basketitems.basket_id = kept.basket_id
+            AND basketitems.product_id = kept.product_id
+            AND basketitems.id > kept.id
+        """
+    )
+    op.create_index('uq_basketitems_basket_product', 'basketitems', ['basket_id', 'product_id'], unique=True)
+
+
+def downgrade() -> None:
+    op.drop_index('uq_basketitems_basket_product', table_name='basketitems')
@@ -0,0 +1,56 @@
+"""store prices as numeric
+
+Revision ID: 9e2f4a6c8d10
+Revises: 7b41c0e9d2a3
+Create Date: 2026-10-17 12:15:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9e2f4a6c8d10'
+down_revision: Union[str, None] = '7b41c0e9d2a3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+PRICE_COLUMNS = (('products', 'price'), ('baskets', 'total_price'), ('basketitems', 'price'))
+
+
+def upgrade() -> None:
+    for table, column in PRICE_COLUMNS:
+        op.alter_column(
+            table, column,
+            type_=sa.Numeric(precision=12, scale=2),
+            existing_type=sa.Float(),
+            existing_nullable=False,
+            postgresql_using=f'round({column}::numeric, 2)',
+        )
+    # После округления суммы активных корзин пересчитываем из позиций
+    op.execute(
+        """
+        UPDATE baskets SET total_price = totals.total
+        FROM (
+            SELECT baskets.id, coalesce(sum(basketitems.price * basketitems.quantity), 0) AS total
+            FROM baskets LEFT JOIN basketitems ON basketitems.basket_id = baskets.id
+            WHERE baskets.active_status
+            GROUP BY baskets.id
+        ) AS totals
+        WHERE baskets.id = totals.id AND baskets.total_price IS DISTINCT FROM totals.total
+        """
+    )
+
+
+def downgrade() -> None:
+    for table, column in PRICE_COLUMNS:
+        op.alter_column(
+            table, column,
+            type_=sa.Float(),
+            existing_type=sa.Numeric(precision=12, scale=2),
+            existing_nullable=False,
+            postgresql_using=f'{column}::double precision',
+        )
@@ -0,0 +1,103 @@
+import base64
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from uuid import uuid4
+
+from fastapi import Request, Response, status
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.cache import Cache, shared_backend
+from app.compression import available_encodings, choose_encoding, compress_body
+from app.config import settings
+from app.database import after_commit
+
+# Готовые JSON-ответы каталога вместе с ETag и Last-Modified:
+# "product:<version>:<id>" - карточка продукта, "list:<version>:<параметры>" - страницы списка.
+# Крупные тела хранятся ещё и сжатыми (base64, чтобы запись оставалась JSON для общего backend):
+# сжимаем один раз при заполнении кэша, а не на каждый запрос
+product_cache = Cache(
+    "product",
+    maxsize=settings.PRODUCT_CACHE_SIZE,
+    ttl=settings.PRODUCT_CACHE_TTL,
+    backend=shared_backend,
+)
+
+
+def make_entry(body: bytes, last_modified: datetime | None) -> dict:
+    if last_modified is None:
+        last_modified = datetime.utcnow()
+    # В БД DateTime без зоны, время сервера считаем UTC
+    last_modified = last_modified.replace(tzinfo=timezone.utc, microsecond=0)
+    encoded = {}
+    if settings.COMPRESSION_ENABLED and len(body) >= settings.COMPRESSION_MIN_SIZE:
+        encoded = {
+            encoding: base64.b64encode(compress_body(body, encoding)).decode()
+            for encoding in available_encodings()
+        }
+    return {
+        "body": body.decode(),
+        "encoded": encoded,
+        "etag": hashlib.blake2b(body, digest_size=16).hexdigest(),
+        "last_modified": format_datetime(last_modified, usegmt=True),
+    }
+
+
+def _not_modified(request: Request, entry: dict, etag: str) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+        # ETag сжатого варианта отличается суффиксом, но содержимое то же
+        return "*" in tags or etag in tags or f'"{entry["etag"]}"' in tags
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since is not None:
+        try:
+            return parsedate_to_datetime(entry["last_modified"]) <= parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
+def cached_response(request: Request, entry: dict) -> Response:
+    """
+    Ответ из записи кэша; при совпадении If-None-Match / If-Modified-Since - 304 без тела.
+    Если клиент принимает сжатие, отдаётся готовый сжатый вариант. Cache-Control и Vary
+    позволяют CDN или reverse proxy хранить страницы каталога у себя
+    """
+    encoded = entry.get("encoded") or {}
+    encoding = choose_encoding(request.headers.get("accept-encoding", ""), tuple(encoded)) if encoded else None
+    etag = f'"{entry["etag"]}-{encoding}"' if encoding else f'"{entry["etag"]}"'
+    headers = {"ETag": etag, "Last-Modified": entry["last_modified"], "Vary": "Accept-Encoding"}
+    if settings.PRODUCT_CACHE_CONTROL:
+        headers["Cache-Control"] = settings.PRODUCT_CACHE_CONTROL
+
+    if _not_modified(request, entry, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    if encoding:
+        headers["Content-Encoding"] = encoding
+        return Response(content=base64.b64decode(encoded[encoding]), media_type="application/json", headers=headers)
+    return Response(content=entry["body"], media_type="application/json", headers=headers)
+
+
+async def get_catalog_version() -> str:
+    # Версию читаем мимо локального LRU: иначе смена версии в одном воркере не дойдёт
+    # до остальных, и они до истечения TTL отдавали бы старые страницы
+    version = await product_cache.get("version", local=False)
+    if version is None:
+        version = uuid4().hex
+        await product_cache.set("version", version, local=False)
+    return version
+
+
+async def invalidate_products():
+    # Новая версия каталога разом делает недействительными все закэшированные страницы
+    # и карточки во всех воркерах; старые записи вытеснит LRU или TTL
+    await product_cache.set("version", uuid4().hex, local=False)
+
+
+def invalidate_products_on_commit(session: AsyncSession):
+    async def callback():
+        await invalidate_products()
+
+    after_commit(session, callback)
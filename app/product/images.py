@@ -0,0 +1,173 @@
+import asyncio
+import hashlib
+import logging
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import AsyncIterator
+from uuid import uuid4
+
+from fastapi import HTTPException, status
+from fastapi.staticfiles import StaticFiles
+from starlette.concurrency import run_in_threadpool
+
+from app.config import settings
+from app.product.cache import invalidate_products
+
+logger = logging.getLogger(__name__)
+
+# Файлы называются sha256 содержимого, поэтому их можно кэшировать навсегда:
+# новое изображение - новое имя. media/products/original/<sha>.<ext>,
+# уменьшенные копии - media/products/<variant>/<sha>.webp
+PRODUCTS_DIR = "products"
+ORIGINAL = "original"
+VARIANTS = {
+    "thumb": settings.IMAGE_THUMB_SIZE,
+    "medium": settings.IMAGE_MEDIUM_SIZE,
+}
+# Сигнатуры поддерживаемых форматов: расширение определяем по содержимому, а не по заголовкам клиента
+SIGNATURES = (
+    (b"\xff\xd8\xff", "jpg"),
+    (b"\x89PNG\r\n\x1a\n", "png"),
+    (b"RIFF", "webp"),
+)
+
+_image_executor: Executor | None = None
+
+
+def get_image_executor() -> Executor:
+    global _image_executor
+    if _image_executor is None:
+        _image_executor = ProcessPoolExecutor(max_workers=settings.IMAGE_WORKERS)
+    return _image_executor
+
+
+def _detect_extension(head: bytes) -> str | None:
+    for signature, extension in SIGNATURES:
+        if head.startswith(signature):
+            if extension == "webp" and head[8:12] != b"WEBP":
+                return None
+            return extension
+    return None
+
+
+def media_path(*parts: str) -> str:
+    return os.path.join(settings.MEDIA_ROOT, PRODUCTS_DIR, *parts)
+
+
+def media_url(*parts: str) -> str:
+    return "/".join((settings.MEDIA_URL.rstrip("/"), PRODUCTS_DIR, *parts))
+
+
+def variant_url(product_image: str | None, variant: str) -> str | None:
+    """
+    URL уменьшенной копии для product_image, загруженного через этот модуль;
+    для внешних ссылок и копий, которые ещё не построены или не построились, None
+    """
+    prefix = media_url(ORIGINAL, "")
+    if not product_image or not product_image.startswith(prefix):
+        return None
+    digest = product_image[len(prefix):].rsplit(".", 1)[0]
+    if not os.path.exists(media_path(variant, f"{digest}.webp")):
+        return None
+    return media_url(variant, f"{digest}.webp")
+
+
+async def save_upload(stream: AsyncIterator[bytes]) -> tuple[str, str]:
+    """
+    Пишет тело запроса на диск по кускам, считая sha256 на лету, и переименовывает
+    файл в <sha>.<ext>. Возвращает (digest, имя файла)
+    """
+    original_dir = media_path(ORIGINAL)
+    await run_in_threadpool(os.makedirs, original_dir, exist_ok=True)
+    temp_path = os.path.join(original_dir, f".upload-{uuid4().hex}")
+
+    digest = hashlib.sha256()
+    size = 0
+    head = b""
+    file = await run_in_threadpool(open, temp_path, "wb")
+    try:
+        try:
+            async for chunk in stream:
+                size += len(chunk)
+                if size > settings.IMAGE_MAX_UPLOAD_SIZE:
+                    raise HTTPException(
+                        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                        detail=f"Image is larger than {settings.IMAGE_MAX_UPLOAD_SIZE} bytes"
+                    )
+                if len(head) < 12:
+                    head += chunk[:12 - len(head)]
+                digest.update(chunk)
+                await run_in_threadpool(file.write, chunk)
+        finally:
+            await run_in_threadpool(file.close)
+
+        extension = _detect_extension(head)
+        if extension is None:
+            raise HTTPException(
+                status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+                detail="Only JPEG, PNG and WebP images are supported"
+            )
+        name = f"{digest.hexdigest()}.{extension}"
+        # Такой файл уже есть - содержимое то же самое, просто заменяем
+        await run_in_threadpool(os.replace, temp_path, os.path.join(original_dir, name))
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    return digest.hexdigest(), name
+
+
+def generate_variants(source: str, digest: str) -> list[str]:
+    """
+    Выполняется в отдельном процессе: декодирование и ресайз занимают CPU на десятки
+    миллисекунд и держали бы GIL. Готовые варианты не пересоздаются
+    """
+    # Pillow нужен только воркерам пула
+    from PIL import Image, ImageOps
+
+    created = []
+    with Image.open(source) as image:
+        image = ImageOps.exif_transpose(image)
+        if image.mode not in ("RGB", "RGBA"):
+            image = image.convert("RGBA" if "transparency" in image.info else "RGB")
+        for variant, size in VARIANTS.items():
+            path = media_path(variant, f"{digest}.webp")
+            if os.path.exists(path):
+                continue
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            resized = image.copy()
+            resized.thumbnail((size, size), Image.LANCZOS)
+            temp_path = f"{path}.{os.getpid()}.tmp"
+            resized.save(temp_path, "WEBP", quality=82, method=4)
+            os.replace(temp_path, path)
+            created.append(path)
+    return created
+
+
+class MediaFiles(StaticFiles):
+    """
+    Раздача /media: имена файлов - хэш содержимого, поэтому браузер и CDN
+    могут хранить их год и не перепроверять
+    """
+
+    def file_response(self, *args, **kwargs):
+        response = super().file_response(*args, **kwargs)
+        response.headers["Cache-Control"] = "public, max-age=31536000, immutable"
+        return response
+
+
+async def build_variants(name: str, digest: str):
+    """
+    Фоновая задача после ответа на загрузку. Закэшированные карточки до этого
+    отдают вместо thumbnail оригинал, поэтому после сборки каталог сбрасывается
+    """
+    loop = asyncio.get_running_loop()
+    try:
+        created = await loop.run_in_executor(
+            get_image_executor(), generate_variants, media_path(ORIGINAL, name), digest
+        )
+    except Exception:
+        logger.exception("Failed to build image variants for %s", name)
+        return
+    if created:
+        await invalidate_products()
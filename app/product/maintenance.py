@@ -0,0 +1,27 @@
+"""
+Обслуживающие команды для корзин и каталога:
+
+    python -m app.product.maintenance recompute_totals
+"""
+import asyncio
+import sys
+
+import app.models  # noqa: F401 - регистрируем все модели до первого запроса
+from app.product.repository import BasketRepository
+
+
+async def recompute_totals():
+    fixed = await BasketRepository.recompute_all_totals()
+    print(f"Recomputed totals, {fixed} basket(s) fixed")
+
+
+COMMANDS = {
+    "recompute_totals": recompute_totals,
+}
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2 or sys.argv[1] not in COMMANDS:
+        print(f"Usage: python -m app.product.maintenance [{'|'.join(COMMANDS)}]")
+        sys.exit(1)
+    asyncio.run(COMMANDS[sys.argv[1]]())
@@ -1,19 +1,43 @@
 from datetime import datetime
+from decimal import Decimal
 from typing import List
 
-from sqlalchemy import Integer, String, Float, Text, DateTime, Boolean, ForeignKey, func
+from sqlalchemy import Integer, String, Numeric, Text, DateTime, Boolean, ForeignKey, Index, Computed, func, text
+from sqlalchemy.dialects.postgresql import TSVECTOR
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from app.database import Base
 
 
 class Product(Base):
+    __table_args__ = (
+        # Индексы под keyset-пагинацию каталога: ORDER BY <поле>, id
+        Index("ix_products_price_id", "price", "id"),
+        Index("ix_products_name_id", "name", "id"),
+        # Полнотекстовый поиск, поиск с опечатками по названию и фильтр "в наличии"
+        Index("ix_products_search_vector", "search_vector", postgresql_using="gin"),
+        Index(
+            "ix_products_name_trgm", "name",
+            postgresql_using="gin", postgresql_ops={"name": "gin_trgm_ops"},
+        ),
+        Index("ix_products_in_stock_price", "price", "id", postgresql_where=text("quantity > 0")),
+    )
 
     name: Mapped[str] = mapped_column(String, index=True)
-    price: Mapped[float] = mapped_column(Float)
+    price: Mapped[Decimal] = mapped_column(Numeric(12, 2))
     description: Mapped[str] = mapped_column(Text)
     quantity: Mapped[int] = mapped_column(Integer)
     product_image: Mapped[str] = mapped_column(String)
+    sku: Mapped[str | None] = mapped_column(String, unique=True, nullable=True)
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime, server_default=func.now(), onupdate=func.now(), nullable=False
+    )
+    # Генерируется базой, в обычных выборках не загружается
+    search_vector: Mapped[str | None] = mapped_column(
+        TSVECTOR,
+        Computed("to_tsvector('simple', coalesce(name, '') || ' ' || coalesce(description, ''))", persisted=True),
+        deferred=True,
+    )
 
     # One to many
     basket_items: Mapped[List["BasketItem"]] = relationship(
@@ -24,7 +48,7 @@ class Product(Base):
 class Basket(Base):
 
     created_at: Mapped[datetime] = mapped_column(DateTime, server_default=func.now(), nullable=False)
-    total_price: Mapped[float] = mapped_column(Float)
+    total_price: Mapped[Decimal] = mapped_column(Numeric(12, 2))
     active_status: Mapped[bool] = mapped_column(Boolean, default=True)
 
     # Many to one
@@ -41,8 +65,12 @@ class Basket(Base):
 
 
 class BasketItem(Base):
+    __table_args__ = (
+        # Один продукт - одна строка в корзине, на этом индексе держится upsert
+        Index("uq_basketitems_basket_product", "basket_id", "product_id", unique=True),
+    )
 
-    price: Mapped[float] = mapped_column(Float)
+    price: Mapped[Decimal] = mapped_column(Numeric(12, 2))
     quantity: Mapped[int] = mapped_column(Integer)
 
     # Many to one
@@ -1,14 +1,217 @@
+from decimal import Decimal
+
+from sqlalchemy import update, delete, select, values, column, literal, or_, and_, func, any_, Integer, Float
+from sqlalchemy.dialects.postgresql import insert, ARRAY
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database import use_session
 from app.product.models import Product, Basket, BasketItem
 from app.repository.base import BaseRepository
 
 
 class ProductRepository(BaseRepository):
     model = Product
+    sortable_fields = ("id", "price", "name")
+    # Уникальный индекс артикула: дубль при создании или правке - 409, а не 500
+    sku_constraint = "products_sku_key"
+
+    @classmethod
+    async def search(
+        cls,
+        q: str | None = None,
+        min_price: Decimal | None = None,
+        max_price: Decimal | None = None,
+        in_stock: bool = False,
+        limit: int = 20,
+        after: tuple | None = None,
+        session: AsyncSession = None
+    ):
+        """
+        Поиск по name/description: tsvector (GIN) плюс триграммы по name для опечаток.
+        Сортировка по релевантности, keyset-пагинация по (rank, id).
+        Возвращает строки, их rank и ключ следующей страницы или None
+        """
+        if q:
+            ts_query = func.websearch_to_tsquery("simple", q)
+            rank = func.ts_rank_cd(Product.search_vector, ts_query) + func.similarity(Product.name, q)
+            match = or_(Product.search_vector.op("@@")(ts_query), Product.name.op("%")(q))
+        else:
+            rank = literal(0.0, Float)
+            match = None
+
+        query = select(Product, rank.label("rank")).order_by(rank.desc(), Product.id).limit(limit + 1)
+        if match is not None:
+            query = query.where(match)
+        if min_price is not None:
+            query = query.where(Product.price >= min_price)
+        if max_price is not None:
+            query = query.where(Product.price <= max_price)
+        if in_stock:
+            query = query.where(Product.quantity > 0)
+        if after is not None:
+            last_rank, last_id = after
+            query = query.where(or_(rank < last_rank, and_(rank == last_rank, Product.id > last_id)))
+
+        async with use_session(session) as session:
+            result = await session.execute(query)
+            rows = result.all()
+
+        if len(rows) <= limit:
+            return rows, None
+        rows = rows[:limit]
+        last = rows[-1]
+        return rows, (last.rank, last.Product.id)
+
+    @classmethod
+    async def decrement_stock(cls, quantities: dict[int, int], session: AsyncSession = None) -> list[int]:
+        """
+        Списывает остатки одним UPDATE ... FROM (VALUES ...) с условием quantity >= нужного,
+        поэтому параллельные оформления не могут уйти в минус.
+        Перед UPDATE строки блокируются SELECT ... ORDER BY id FOR UPDATE: порядок
+        блокировок в самом UPDATE выбирает планировщик, и пересекающиеся корзины
+        иначе могут взаимно заблокироваться.
+        Возвращает id продуктов, которых не хватило; если список не пуст, вызывающий
+        обязан откатить транзакцию - остальные позиции уже списаны
+        """
+        if not quantities:
+            return []
+
+        needed = values(
+            column("id", Integer), column("quantity", Integer), name="needed"
+        ).data(sorted(quantities.items()))
+        lock = (
+            select(Product.id)
+            .where(Product.id == any_(literal(sorted(quantities), ARRAY(Integer))))
+            .order_by(Product.id)
+            .with_for_update()
+        )
+        query = (
+            update(Product)
+            .where(Product.id == needed.c.id, Product.quantity >= needed.c.quantity)
+            .values(quantity=Product.quantity - needed.c.quantity, updated_at=func.now())
+            .returning(Product.id)
+            .execution_options(synchronize_session=False)
+        )
+        async with use_session(session) as session:
+            await session.execute(lock)
+            result = await session.execute(query)
+            updated = set(result.scalars().all())
+            missing = sorted(set(quantities) - updated)
+            if not missing:
+                await cls._save(session)
+            return missing
 
 
 class BasketRepository(BaseRepository):
     model = Basket
 
+    @classmethod
+    async def add_to_total(cls, basket_id: int, delta: Decimal, session: AsyncSession = None):
+        """
+        Атомарно сдвигает total_price корзины на delta: UPDATE ... SET total_price = total_price + :delta
+        """
+        query = (
+            update(Basket)
+            .where(Basket.id == basket_id)
+            .values(total_price=Basket.total_price + delta)
+            .returning(Basket.total_price)
+            .execution_options(synchronize_session="fetch")
+        )
+        async with use_session(session) as session:
+            result = await session.execute(query)
+            await cls._save(session)
+            return result.scalar_one_or_none()
+
+    @classmethod
+    async def recompute_all_totals(cls, session: AsyncSession = None) -> int:
+        """
+        Пересчитывает total_price всех активных корзин одним UPDATE ... FROM (SELECT sum ...).
+        Возвращает число исправленных корзин
+        """
+        totals = (
+            select(
+                Basket.id.label("basket_id"),
+                func.coalesce(func.sum(BasketItem.price * BasketItem.quantity), 0).label("total"),
+            )
+            .outerjoin(BasketItem, BasketItem.basket_id == Basket.id)
+            .where(Basket.active_status == True)
+            .group_by(Basket.id)
+            .subquery()
+        )
+        query = (
+            update(Basket)
+            .where(Basket.id == totals.c.basket_id, Basket.total_price.is_distinct_from(totals.c.total))
+            .values(total_price=totals.c.total)
+            .execution_options(synchronize_session=False)
+        )
+        async with use_session(session) as session:
+            result = await session.execute(query)
+            await cls._save(session)
+            return result.rowcount
+
+    @classmethod
+    async def recompute_total(cls, basket_id: int, session: AsyncSession = None):
+        """
+        Пересчитывает total_price корзины одним агрегатом по её позициям
+        """
+        total = (
+            select(func.coalesce(func.sum(BasketItem.price * BasketItem.quantity), 0))
+            .where(BasketItem.basket_id == basket_id)
+            .scalar_subquery()
+        )
+        query = (
+            update(Basket)
+            .where(Basket.id == basket_id)
+            .values(total_price=total)
+            .returning(Basket.total_price)
+            .execution_options(synchronize_session=False)
+        )
+        async with use_session(session) as session:
+            result = await session.execute(query)
+            await cls._save(session)
+            return result.scalar_one_or_none()
+
 
 class BasketItemRepository(BaseRepository):
     model = BasketItem
+
+    @classmethod
+    async def set_basket_contents(
+        cls, basket_id: int, quantities: dict[int, int], session: AsyncSession = None
+    ) -> list[int]:
+        """
+        Приводит содержимое корзины к quantities (product_id -> quantity):
+        INSERT ... ON CONFLICT по (basket_id, product_id) с ценой из products и
+        удаление всех остальных позиций. Возвращает id несуществующих продуктов;
+        если список не пуст, вызывающий обязан откатить транзакцию
+        """
+        quantities = {product_id: quantity for product_id, quantity in quantities.items() if quantity > 0}
+
+        async with use_session(session) as session:
+            missing = []
+            if quantities:
+                wanted = values(
+                    column("product_id", Integer), column("quantity", Integer), name="wanted"
+                ).data(sorted(quantities.items()))
+                # Core-таблица: ORM-вставке не нужен identity map для этих строк
+                query = insert(BasketItem.__table__).from_select(
+                    ["basket_id", "product_id", "quantity", "price"],
+                    select(literal(basket_id, Integer), Product.id, wanted.c.quantity, Product.price)
+                    .join(wanted, wanted.c.product_id == Product.id),
+                )
+                query = query.on_conflict_do_update(
+                    index_elements=["basket_id", "product_id"],
+                    set_={"quantity": query.excluded.quantity, "price": query.excluded.price},
+                ).returning(BasketItem.__table__.c.product_id)
+                result = await session.execute(query)
+                missing = sorted(set(quantities) - set(result.scalars().all()))
+
+            query = delete(BasketItem).where(
+                BasketItem.basket_id == basket_id,
+                or_(BasketItem.product_id.is_(None), BasketItem.product_id.not_in(list(quantities))),
+            ).execution_options(synchronize_session=False)
+            await session.execute(query)
+
+            if not missing:
+                await cls._save(session)
+            return missing
@@ -1,15 +1,19 @@
 from datetime import datetime
 
-from fastapi import APIRouter, status, Depends, HTTPException
+from fastapi import APIRouter, status, Depends, HTTPException, Response
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import selectinload
+from sqlalchemy.orm import joinedload, load_only, raiseload, selectinload
+from sqlalchemy.orm.attributes import set_committed_value
 
 from app.database import get_session
-from app.product.models import Basket, BasketItem
+from app.product.cache import invalidate_products_on_commit
+from app.product.models import Basket, BasketItem, Product
 from app.product.repository import BasketRepository, ProductRepository, BasketItemRepository
-from app.product.schemas import SRBasket, SCBasket, SUBasket, SRBasketItem, SCBasketItem
-from app.repository.schemas import SBaseListResponse
+from app.product.schemas import (
+    SRBasket, SCBasket, SUBasket, SRBasketItem, SCBasketItem, SBasketItemQuantity, SRBasketSummary, BasketView
+)
+from app.responses import model_response
 from app.user.dependencies import get_current_user
 
 router = APIRouter(
@@ -18,45 +22,81 @@ router = APIRouter(
 )
 
 
-@router.post("/", response_model=SRBasket, status_code=status.HTTP_201_CREATED)
+def basket_options(view: BasketView) -> list:
+    """
+    Опции загрузки корзины под представление ответа. summary - один узкий запрос:
+    позиции через JOIN только с нужными столбцами, продукты не загружаются вовсе
+    """
+    if view == BasketView.summary:
+        return [
+            load_only(Basket.id, Basket.created_at, Basket.total_price, Basket.active_status),
+            joinedload(Basket.basket_items).load_only(
+                BasketItem.id, BasketItem.price, BasketItem.quantity, BasketItem.product_id
+            ),
+            raiseload("*"),
+        ]
+    return [selectinload(Basket.basket_items).selectinload(BasketItem.product)]
+
+
+def basket_response(
+    basket: Basket, current_user, status_code: int = status.HTTP_200_OK, view: BasketView = BasketView.full
+) -> Response:
+    """
+    SRBasket без загрузки Basket.user: владелец активной корзины - текущий пользователь.
+    Позиции валидируются из ORM один раз, вместе со всей корзиной
+    """
+    if view == BasketView.summary:
+        return model_response(SRBasketSummary.model_validate(basket), status_code=status_code)
+    return model_response(
+        SRBasket.model_validate(
+            {
+                "id": basket.id,
+                "created_at": basket.created_at,
+                "total_price": basket.total_price,
+                "active_status": basket.active_status,
+                "basket_items": basket.basket_items,
+                "user": current_user.model_dump(),
+            },
+            from_attributes=True,
+        ),
+        status_code=status_code,
+    )
+
+
+@router.post("/", response_model=SRBasket | SRBasketSummary, status_code=status.HTTP_201_CREATED)
 async def get_or_create_basket(
+    view: BasketView = BasketView.full,
     session: AsyncSession = Depends(get_session),
     current_user: str = Depends(get_current_user)
 ):
     """
-    Получение или создание новой корзины для текущего пользователя
+    Получение или создание новой корзины для текущего пользователя.
+    view=summary - без владельца и карточек продуктов, только id продуктов в позициях
     """
 
     # Проверяем, есть ли уже активная корзина у пользователя
-    query = select(Basket).options(
-        selectinload(Basket.basket_items).selectinload(BasketItem.product),
-        selectinload(Basket.user)
-    ).filter(Basket.user_id == current_user.id, Basket.active_status == True)
+    query = select(Basket).options(*basket_options(view)).filter(
+        Basket.user_id == current_user.id, Basket.active_status == True
+    )
     result = await session.execute(query)
-    basket = result.scalar_one_or_none()
+    basket = result.unique().scalar_one_or_none()
 
     # Если активная корзина уже существует, возвращаем её
     if basket:
-        return SRBasket.from_orm(basket)
+        return basket_response(basket, current_user, status.HTTP_201_CREATED, view)
 
     # Иначе создаем новую корзину
     new_basket = await BasketRepository.create(
         session=session,
         user_id=current_user.id,
         active_status=True,
-        total_price=0.0,
+        total_price=0,
         created_at=datetime.utcnow()
     )
 
-    # Заново выполняем запрос, чтобы загрузить связанные объекты, ебался с этим
-    query = select(Basket).options(
-        selectinload(Basket.basket_items).selectinload(BasketItem.product),
-        selectinload(Basket.user)
-    ).filter(Basket.id == new_basket.id)
-    result = await session.execute(query)
-    basket = result.scalar_one()
-
-    return SRBasket.from_orm(basket)
+    # Новая корзина пуста - перечитывать её из БД незачем
+    set_committed_value(new_basket, "basket_items", [])
+    return basket_response(new_basket, current_user, status.HTTP_201_CREATED, view)
 
 
 @router.post("/items", response_model=SRBasketItem, status_code=status.HTTP_201_CREATED)
@@ -85,7 +125,7 @@ async def add_or_update_item_in_basket(
     result = await session.execute(query)
     basket_item = result.scalar_one_or_none()
 
-    product = await ProductRepository.get_by_id(item_data.product_id)
+    product = await ProductRepository.get_by_id(item_data.product_id, session=session)
     if not product:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -94,7 +134,6 @@ async def add_or_update_item_in_basket(
 
     if basket_item:
         basket_item.quantity += item_data.quantity
-        basket.total_price += product.price * item_data.quantity
     else:
         # Или создаем новый элемент в корзине
         basket_item = await BasketItemRepository.create(
@@ -104,16 +143,53 @@ async def add_or_update_item_in_basket(
             quantity=item_data.quantity,
             price=product.price
         )
-        basket.total_price += product.price * item_data.quantity
 
-    await session.commit()
+    # Сумму корзины меняем в SQL, а не read-modify-write в Python
+    await BasketRepository.add_to_total(basket.id, product.price * item_data.quantity, session=session)
+
+    # Продукт уже загружен выше - подставляем его в связь вместо повторного запроса
+    set_committed_value(basket_item, "product", product)
+    return model_response(SRBasketItem.model_validate(basket_item), status_code=status.HTTP_201_CREATED)
+
+
+@router.put("/items:bulk", response_model=SRBasket | SRBasketSummary)
+async def set_basket_items(
+    items: list[SBasketItemQuantity],
+    view: BasketView = BasketView.full,
+    session: AsyncSession = Depends(get_session),
+    current_user: str = Depends(get_current_user)
+):
+    """
+    Полная замена содержимого активной корзины: позиции из запроса создаются или
+    обновляются, остальные удаляются, итоговая сумма пересчитывается в БД
+    """
+
+    query = select(Basket.id).filter(Basket.user_id == current_user.id, Basket.active_status == True)
+    result = await session.execute(query)
+    basket_id = result.scalar_one_or_none()
+
+    if basket_id is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Active basket not found"
+        )
+
+    quantities = {item.product_id: item.quantity for item in items}
+    missing = await BasketItemRepository.set_basket_contents(basket_id, quantities, session=session)
+    if missing:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Products not found: {', '.join(map(str, missing))}"
+        )
+    await BasketRepository.recompute_total(basket_id, session=session)
 
-    # Выполняем запрос с предварительной загрузкой связанного объекта, маму ебал предварительных загрузок
-    query = select(BasketItem).options(selectinload(BasketItem.product)).filter(BasketItem.id == basket_item.id)
+    query = select(Basket).options(*basket_options(view)).filter(
+        Basket.id == basket_id
+    ).execution_options(populate_existing=True)
     result = await session.execute(query)
-    updated_basket_item = result.scalar_one()
+    basket = result.unique().scalar_one()
 
-    return SRBasketItem.from_orm(updated_basket_item)
+    return basket_response(basket, current_user, view=view)
 
 
 @router.delete("/items/{item_id}", status_code=status.HTTP_200_OK)
@@ -139,7 +215,7 @@ async def remove_item_from_basket(
         )
 
     # Проверяем наличие элемента в корзине
-    item = await BasketItemRepository.get_by_id(item_id)
+    item = await BasketItemRepository.get_by_id(item_id, session=session)
     if not item or item.basket_id != basket.id or item.quantity < quantity:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -147,16 +223,14 @@ async def remove_item_from_basket(
         )
 
     # Обновляем цену корзины и количество товара
-    basket.total_price -= item.price * quantity
+    await BasketRepository.add_to_total(basket.id, -item.price * quantity, session=session)
     if item.quantity > quantity:
         item.quantity -= quantity
         session.add(item)
-        await session.commit()
-        await session.refresh(item)
     else:
         await BasketItemRepository.destroy(item_id, session)
 
-    await session.commit()
+    await session.flush()
 
     return {
         "message": "Item quantity updated successfully" if item.quantity > 0 else "Item removed from basket successfully"
@@ -185,27 +259,49 @@ async def checkout_basket(
             detail="Active basket not found"
         )
 
-    # Обновляем количество товаров на складе
+    # Списываем остатки всех позиций одним запросом
+    quantities: dict[int, int] = {}
+    deleted_products = False
     for item in basket.basket_items:
-        product = await ProductRepository.get_by_id(item.product_id)
-        if not product:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail=f"Product with ID {item.product_id} not found"
-            )
-        if product.quantity < item.quantity:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail=f"Insufficient quantity for product '{product.name}'"
-            )
-
-        # Уменьшаем количество на складе
-        product.quantity -= item.quantity
-        session.add(product)
+        if item.product_id is None:
+            deleted_products = True
+            continue
+        quantities[item.product_id] = quantities.get(item.product_id, 0) + item.quantity
+
+    if deleted_products:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Basket contains products that no longer exist"
+        )
+
+    missing = await ProductRepository.decrement_stock(quantities, session=session)
+    if missing:
+        # Исключение откатит транзакцию в get_session вместе с уже списанными позициями
+        query = select(Product.id, Product.name, Product.quantity).filter(Product.id.in_(missing))
+        result = await session.execute(query)
+        found = {row.id: row for row in result}
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail={
+                "message": "Insufficient quantity for some products",
+                "products": [
+                    {
+                        "id": product_id,
+                        "name": found[product_id].name if product_id in found else None,
+                        "requested": quantities[product_id],
+                        "available": found[product_id].quantity if product_id in found else 0,
+                    }
+                    for product_id in missing
+                ]
+            }
+        )
+
+    # Остатки изменились - сбрасываем кэш каталога после коммита
+    invalidate_products_on_commit(session)
 
     # Изменяем статус корзины на неактивный
     basket.active_status = False
-    await session.commit()
+    await session.flush()
 
     return {
         "message": "Basket checked out successfully"
@@ -1,10 +1,25 @@
-from fastapi import APIRouter, Depends, status, HTTPException
+from decimal import Decimal
+from typing import Literal
+
+from fastapi import APIRouter, BackgroundTasks, Depends, Query, Request, status, HTTPException
+from fastapi.responses import StreamingResponse
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.database import get_session
+from app.product.cache import (
+    product_cache, get_catalog_version, make_entry, cached_response, invalidate_products,
+    invalidate_products_on_commit
+)
+from app.product.images import ORIGINAL, build_variants, media_url, save_upload
 from app.product.repository import ProductRepository
-from app.product.schemas import SCProduct, SRProduct, SUProduct
-from app.repository.schemas import SBaseListResponse
+from app.product.schemas import (
+    SCProduct, SRProduct, SUProduct, SRProductPage, SRProductCursorPage, SRProductSearchPage
+)
+from app.product.transfer import export_csv, export_ndjson, import_products
+from app.repository.schemas import CountMode
+from app.repository.tools import encode_cursor, decode_cursor, get_list_data, is_unique_violation
+from app.responses import model_response
 
 from app.user.dependencies import get_current_user
 
@@ -23,48 +38,227 @@ async def create_product(
     """
     Создание нового продукта.
     """
-    new_product = await ProductRepository.create(
-        session=session,
-        **product_data.dict()
-    )
-    return SRProduct.from_orm(new_product)
+    try:
+        new_product = await ProductRepository.create(
+            session=session,
+            **product_data.model_dump()
+        )
+    except IntegrityError as e:
+        if not is_unique_violation(e, ProductRepository.sku_constraint):
+            raise
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Product with this sku already exists"
+        )
+    invalidate_products_on_commit(session)
+    return model_response(SRProduct.model_validate(new_product), status_code=status.HTTP_201_CREATED)
 
 
-@router.get("/", response_model=SBaseListResponse)
+@router.get("/", response_model=SRProductPage | SRProductCursorPage)
 async def get_all_products(
-    page: int = 1,
-    limit: int = 10
+    request: Request,
+    page: int = Query(1, ge=1),
+    limit: int = Query(10, ge=1, le=100),
+    cursor: str | None = None,
+    sort: str = "id",
+    count_mode: CountMode = CountMode.exact,
+    session: AsyncSession = Depends(get_session)
 ):
     """
-    Получения всех продуктов. Доступно неавторизованным пользователям
+    Получения всех продуктов. Доступно неавторизованным пользователям.
+    Если передан cursor (для первой страницы пустой), отдаётся keyset-страница
+    с next_cursor вместо номера страницы. count_mode управляет подсчётом total.
+    Страницы кэшируются до изменения каталога и поддерживают If-None-Match
     """
-    products = await ProductRepository.paginate(page=page, limit=limit)
-    total = await ProductRepository.count()
+    version = await get_catalog_version()
+    cache_key = f"list:{version}:{page}:{limit}:{cursor}:{sort}:{count_mode.value}"
+    entry = await product_cache.get(cache_key)
+    if entry is not None:
+        return cached_response(request, entry)
 
-    products_data = [SRProduct.from_orm(product) for product in products]
-    return {
-        "data": products_data,
-        "total": total,
-        "page": page,
-        "limit": limit
-    }
+    if cursor is not None:
+        after = None
+        if cursor:
+            try:
+                sort, after = decode_cursor(cursor)
+            except ValueError:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="Invalid cursor"
+                )
+        if sort not in ProductRepository.sortable_fields:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Sorting by '{sort}' is not allowed"
+            )
+
+        try:
+            products, next_after = await ProductRepository.paginate_by_cursor(
+                limit=limit, after=after, sort_key=sort, session=session
+            )
+        except ValueError:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Invalid cursor"
+            )
+        response_data = SRProductCursorPage.model_validate(
+            {
+                "data": products,
+                "limit": limit,
+                "sort": sort,
+                "next_cursor": encode_cursor(sort, next_after) if next_after else None
+            },
+            from_attributes=True
+        )
+    else:
+        list_data = await get_list_data(ProductRepository, page=page, limit=limit, count_mode=count_mode)
+        products = list_data["data"]
+        # Строки ORM валидируются один раз, вместе со всей страницей
+        response_data = SRProductPage.model_validate(list_data, from_attributes=True)
+
+    last_modified = max((product.updated_at for product in products), default=None)
+    entry = make_entry(response_data.__pydantic_serializer__.to_json(response_data), last_modified)
+    await product_cache.set(cache_key, entry)
+    return cached_response(request, entry)
+
+
+@router.post("/import", status_code=status.HTTP_200_OK)
+async def import_products_route(
+    request: Request,
+    format: Literal["csv", "ndjson"] = "csv",
+    current_user: str = Depends(get_current_user)
+):
+    """
+    Массовый импорт каталога из CSV или NDJSON в теле запроса. Обязательный
+    столбец sku - по нему существующие продукты обновляются. Возвращает
+    количество обработанных строк и строки с ошибками
+    """
+    report = await import_products(request.stream(), format)
+    if report["upserted"]:
+        await invalidate_products()
+    return report
+
+
+@router.get("/export")
+async def export_products_route(
+    format: Literal["csv", "ndjson"] = "csv",
+    current_user: str = Depends(get_current_user)
+):
+    """
+    Потоковая выгрузка всего каталога в CSV или NDJSON
+    """
+    if format == "csv":
+        return StreamingResponse(
+            export_csv(),
+            media_type="text/csv",
+            headers={"Content-Disposition": 'attachment; filename="products.csv"'}
+        )
+    return StreamingResponse(
+        export_ndjson(),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": 'attachment; filename="products.ndjson"'}
+    )
+
+
+@router.get("/search", response_model=SRProductSearchPage)
+async def search_products(
+    q: str | None = None,
+    min_price: Decimal | None = None,
+    max_price: Decimal | None = None,
+    in_stock: bool = False,
+    limit: int = Query(20, ge=1, le=100),
+    cursor: str | None = None,
+    session: AsyncSession = Depends(get_session)
+):
+    """
+    Поиск продуктов по названию и описанию с учётом опечаток, фильтрами по цене
+    и наличию. Результаты отсортированы по релевантности, следующая страница по next_cursor
+    """
+    after = None
+    if cursor:
+        try:
+            sort, (last_rank, last_id) = decode_cursor(cursor)
+            if sort != "relevance":
+                raise ValueError
+            after = (float(last_rank), last_id)
+        except (TypeError, ValueError):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Invalid cursor"
+            )
+
+    rows, next_after = await ProductRepository.search(
+        q=q,
+        min_price=min_price,
+        max_price=max_price,
+        in_stock=in_stock,
+        limit=limit,
+        after=after,
+        session=session
+    )
+    return model_response(SRProductSearchPage.model_validate({
+        "data": [
+            {**{name: getattr(row.Product, name) for name in SRProduct.model_fields}, "rank": row.rank}
+            for row in rows
+        ],
+        "limit": limit,
+        "sort": "relevance",
+        "next_cursor": encode_cursor("relevance", next_after) if next_after else None
+    }))
 
 
 @router.get("/{product_id}", response_model=SRProduct)
 async def get_product(
     product_id: int,
+    request: Request,
     session: AsyncSession = Depends(get_session)
 ):
     """
-    Получения продукта по его id. Доступно неавторизованным пользователям
+    Получения продукта по его id. Доступно неавторизованным пользователям.
+    При совпадении If-None-Match отвечает 304 прямо из кэша, без БД
+    """
+    version = await get_catalog_version()
+    cache_key = f"product:{version}:{product_id}"
+    entry = await product_cache.get(cache_key)
+    if entry is None:
+        product = await ProductRepository.get_by_id(product_id, session=session)
+        if not product:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Product not found"
+            )
+        response_data = SRProduct.model_validate(product)
+        entry = make_entry(response_data.__pydantic_serializer__.to_json(response_data), product.updated_at)
+        await product_cache.set(cache_key, entry)
+    return cached_response(request, entry)
+
+
+@router.post("/{product_id}/image", response_model=SRProduct, status_code=status.HTTP_201_CREATED)
+async def upload_product_image(
+    product_id: int,
+    request: Request,
+    background_tasks: BackgroundTasks,
+    session: AsyncSession = Depends(get_session),
+    current_user: str = Depends(get_current_user)
+):
+    """
+    Загрузка изображения продукта сырым телом запроса (JPEG, PNG или WebP).
+    Файл пишется на диск потоком, уменьшенные копии строятся в фоне после ответа
     """
-    product = await ProductRepository.get_by_id(product_id)
+    product = await ProductRepository.get_by_id(product_id, session=session)
     if not product:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Product not found"
         )
-    return product
+
+    digest, name = await save_upload(request.stream())
+    updated_product = await ProductRepository.update(
+        product_id, {"product_image": media_url(ORIGINAL, name)}, session=session
+    )
+    invalidate_products_on_commit(session)
+    background_tasks.add_task(build_variants, name, digest)
+    return model_response(SRProduct.model_validate(updated_product), status_code=status.HTTP_201_CREATED)
 
 
 @router.put("/{product_id}", response_model=SRProduct)
@@ -77,13 +271,24 @@ async def update_product(
     """
     Редактирования продукта
     """
-    updated_product = await ProductRepository.update(product_id, product_update.dict(exclude_unset=True))
+    try:
+        updated_product = await ProductRepository.update(
+            product_id, product_update.model_dump(exclude_unset=True), session=session
+        )
+    except IntegrityError as e:
+        if not is_unique_violation(e, ProductRepository.sku_constraint):
+            raise
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Product with this sku already exists"
+        )
     if not updated_product:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Product not found"
         )
-    return updated_product
+    invalidate_products_on_commit(session)
+    return model_response(SRProduct.model_validate(updated_product))
 
 
 @router.delete("/{product_id}", status_code=status.HTTP_200_OK)
@@ -102,6 +307,7 @@ async def delete_product(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Product not found"
         )
+    invalidate_products_on_commit(session)
 
     return {
         "message": "Product deleted successfully"
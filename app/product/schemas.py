@@ -1,17 +1,21 @@
 from datetime import datetime
+from enum import Enum
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field, computed_field
 from typing import List
 
+from app.product.images import variant_url
+from app.repository.schemas import Money, SBaseListResponse, SCursorListResponse
 from app.user.schemas import SRUser
 
 
 class SGProduct(BaseModel):
     name: str
-    price: float
+    price: Money
     description: str
     quantity: int
     product_image: str
+    sku: str | None = None  # Артикул - естественный ключ для импорта
 
 
 class SCProduct(SGProduct):
@@ -21,24 +25,42 @@ class SCProduct(SGProduct):
 
 class SUProduct(BaseModel):
     name: str | None
-    price: float | None
+    price: Money | None
     description: str | None
     quantity: int | None
     product_image: str | None
+    sku: str | None = None
 
 
 class SRProduct(SGProduct):
     id: int
 
+    @computed_field
+    @property
+    def thumbnail(self) -> str | None:
+        """
+        Уменьшенная копия для списков; пока она не построена - само изображение
+        """
+        return variant_url(self.product_image, "thumb") or self.product_image or None
+
     class Config:
         from_attributes = True
 
+
+class SRProductSearchHit(SRProduct):
+    rank: float
+
+
+SRProductPage = SBaseListResponse[SRProduct]
+SRProductCursorPage = SCursorListResponse[SRProduct]
+SRProductSearchPage = SCursorListResponse[SRProductSearchHit]
+
 # Product
 # ---------------------------------------------------------------------------------------------------------------------
 
 
 class SGBasketItem(BaseModel):
-    price: float
+    price: Money
     quantity: int
 
 
@@ -47,8 +69,13 @@ class SCBasketItem(SGBasketItem):
     basket_id: int
 
 
+class SBasketItemQuantity(BaseModel):
+    product_id: int
+    quantity: int = Field(ge=0)  # 0 - убрать продукт из корзины
+
+
 class SUBasketItem(BaseModel):
-    price: float | None
+    price: Money | None
     quantity: int | None
 
 
@@ -59,12 +86,20 @@ class SRBasketItem(SGBasketItem):
     class Config:
         from_attributes = True
 
+
+class SRBasketItemSummary(SGBasketItem):
+    id: int
+    product_id: int | None  # None, если продукт удалён из каталога
+
+    class Config:
+        from_attributes = True
+
 # BasketItem
 # ---------------------------------------------------------------------------------------------------------------------
 
 
 class SGBasket(BaseModel):
-    total_price: float
+    total_price: Money
     active_status: bool
 
 
@@ -73,7 +108,7 @@ class SCBasket(SGBasket):
 
 
 class SUBasket(BaseModel):
-    total_price: float | None
+    total_price: Money | None
     active_status: bool | None
 
 
@@ -86,5 +121,22 @@ class SRBasket(SGBasket):
     class Config:
         from_attributes = True
 
+
+class SRBasketSummary(SGBasket):
+    """
+    Корзина без владельца и карточек продуктов: они у клиента уже есть
+    """
+    id: int
+    created_at: datetime
+    basket_items: List[SRBasketItemSummary] = []
+
+    class Config:
+        from_attributes = True
+
+
+class BasketView(str, Enum):
+    full = "full"
+    summary = "summary"
+
 # Basket
 # ---------------------------------------------------------------------------------------------------------------------
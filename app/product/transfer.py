@@ -0,0 +1,260 @@
+import asyncio
+import csv
+import json
+import logging
+from contextlib import suppress
+from decimal import Decimal, InvalidOperation
+from typing import AsyncIterator
+
+from sqlalchemy import select, text
+
+from app.config import settings
+from app.database import engine
+from app.product.models import Product
+
+logger = logging.getLogger(__name__)
+
+EXPORT_COLUMNS = ("id", "sku", "name", "price", "description", "quantity", "product_image")
+IMPORT_COLUMNS = ("sku", "name", "price", "description", "quantity", "product_image")
+# Сколько строк с ошибками возвращать клиенту, остальные только считаем
+MAX_REPORTED_ERRORS = 100
+# Верхняя граница integer в Postgres
+MAX_QUANTITY = 2 ** 31 - 1
+
+CREATE_STAGING = text(
+    """
+    CREATE TEMP TABLE product_import (
+        sku text, name text, price numeric(12, 2), description text, quantity integer, product_image text
+    ) ON COMMIT DROP
+    """
+)
+UPSERT_FROM_STAGING = text(
+    """
+    INSERT INTO products (sku, name, price, description, quantity, product_image)
+    SELECT sku, name, price, description, quantity, product_image FROM product_import
+    ON CONFLICT (sku) DO UPDATE SET
+        name = excluded.name,
+        price = excluded.price,
+        description = excluded.description,
+        quantity = excluded.quantity,
+        product_image = excluded.product_image,
+        updated_at = now()
+    """
+)
+TRUNCATE_STAGING = text("TRUNCATE product_import")
+
+
+async def export_csv() -> AsyncIterator[bytes]:
+    """
+    COPY (SELECT ...) TO STDOUT прямо в ответ: asyncpg отдаёт куски по мере чтения,
+    очередь ограничена, так что весь каталог в памяти не собирается
+    """
+    query = f"SELECT {', '.join(EXPORT_COLUMNS)} FROM products ORDER BY id"
+    queue: asyncio.Queue[bytes | None] = asyncio.Queue(maxsize=16)
+
+    async with engine.connect() as conn:
+        raw = await conn.get_raw_connection()
+
+        async def put(data):
+            # asyncpg отдаёт bytearray, а StreamingResponse принимает только bytes
+            await queue.put(bytes(data))
+
+        async def copy():
+            try:
+                await raw.driver_connection.copy_from_query(
+                    query, output=put, format="csv", header=True
+                )
+            except asyncio.CancelledError:
+                # Клиент ушёл - очередь никто не читает, маркер конца не нужен
+                raise
+            except BaseException:
+                await queue.put(None)
+                raise
+            await queue.put(None)
+
+        task = asyncio.create_task(copy())
+        try:
+            while (chunk := await queue.get()) is not None:
+                yield chunk
+            await task
+        finally:
+            # Клиент ушёл посреди выгрузки: дожидаемся остановки COPY, а само подключение
+            # выбрасываем - протокол asyncpg остался посреди COPY, в пул его возвращать нельзя
+            if not task.done():
+                task.cancel()
+                with suppress(asyncio.CancelledError):
+                    await task
+                await conn.invalidate()
+
+
+async def export_ndjson() -> AsyncIterator[bytes]:
+    query = select(*(getattr(Product, name) for name in EXPORT_COLUMNS)).order_by(Product.id)
+    async with engine.connect() as conn:
+        result = await conn.stream(query.execution_options(yield_per=1000))
+        async for rows in result.partitions():
+            yield "".join(
+                json.dumps({**row._asdict(), "price": float(row.price)}, ensure_ascii=False) + "\n"
+                for row in rows
+            ).encode()
+
+
+async def _iter_lines(stream: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    buffer = b""
+    async for chunk in stream:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            yield line
+    if buffer.strip():
+        yield buffer
+
+
+def _decode(line: bytes) -> str:
+    try:
+        return line.decode("utf-8-sig").rstrip("\r")
+    except UnicodeDecodeError:
+        raise ValueError("Line is not valid UTF-8")
+
+
+async def _iter_csv(stream: AsyncIterator[bytes]) -> AsyncIterator[tuple[int, dict | str]]:
+    header = None
+    pending, start_line, line_number = "", 0, 0
+    async for raw_line in _iter_lines(stream):
+        line_number += 1
+        if not pending:
+            start_line = line_number
+        try:
+            line = _decode(raw_line)
+        except ValueError as e:
+            # Недекодируемая строка обрывает и начатое многострочное поле
+            pending = ""
+            yield start_line, str(e)
+            continue
+        pending = f"{pending}\n{line}" if pending else line
+        # Кавычки внутри поля удваиваются, поэтому нечётное их число - поле ещё продолжается
+        if pending.count('"') % 2:
+            continue
+        try:
+            record = next(csv.reader([pending]))
+        except csv.Error as e:
+            yield start_line, str(e)
+            continue
+        finally:
+            pending = ""
+        if header is None:
+            header = [name.strip() for name in record]
+            continue
+        if len(record) != len(header):
+            yield start_line, "Wrong number of columns"
+            continue
+        yield start_line, dict(zip(header, record))
+    if pending:
+        yield start_line, "Unterminated quoted field"
+
+
+async def _iter_ndjson(stream: AsyncIterator[bytes]) -> AsyncIterator[tuple[int, dict | str]]:
+    line_number = 0
+    async for raw_line in _iter_lines(stream):
+        line_number += 1
+        try:
+            line = _decode(raw_line)
+        except ValueError as e:
+            yield line_number, str(e)
+            continue
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError:
+            yield line_number, "Invalid JSON"
+            continue
+        yield line_number, record if isinstance(record, dict) else "Expected a JSON object"
+
+
+def _text(record: dict, field: str) -> str:
+    value = str(record.get(field) or "")
+    # COPY не примет NUL в text и уронит всю пачку
+    if "\x00" in value:
+        raise ValueError(f"{field} must not contain NUL characters")
+    return value
+
+
+def _quantity(record: dict) -> int:
+    value = record.get("quantity")
+    if value is None or value == "":
+        return 0
+    # int() молча съел бы true и 1.5
+    if isinstance(value, bool) or isinstance(value, float) and not value.is_integer():
+        raise ValueError("quantity must be an integer")
+    try:
+        quantity = int(value)
+    except (TypeError, ValueError):
+        raise ValueError("quantity must be an integer")
+    if quantity > MAX_QUANTITY:
+        raise ValueError("quantity is out of range")
+    return quantity
+
+
+def _to_row(record: dict) -> tuple:
+    sku = _text(record, "sku").strip()
+    if not sku:
+        raise ValueError("sku is required")
+    name = _text(record, "name").strip()
+    if not name:
+        raise ValueError("name is required")
+    try:
+        price = Decimal(str(record.get("price"))).quantize(Decimal("0.01"))
+    except InvalidOperation:
+        raise ValueError("price must be a number")
+    if not price.is_finite() or price >= 10 ** 10:
+        raise ValueError("price is out of range")
+    quantity = _quantity(record)
+    if price < 0 or quantity < 0:
+        raise ValueError("price and quantity must not be negative")
+    return sku, name, price, _text(record, "description"), quantity, _text(record, "product_image")
+
+
+async def import_products(stream: AsyncIterator[bytes], format: str) -> dict:
+    """
+    Потоковый импорт: тело читается кусками, валидные строки пачками по
+    PRODUCT_IMPORT_BATCH_SIZE уходят через COPY во временную таблицу и оттуда
+    одним INSERT ... ON CONFLICT (sku) в products. Всё в одной транзакции
+    """
+    records = _iter_csv(stream) if format == "csv" else _iter_ndjson(stream)
+    report = {"processed": 0, "upserted": 0, "failed": 0, "errors": []}
+
+    async with engine.begin() as conn:
+        # Первый execute открывает транзакцию, в которой живёт временная таблица
+        await conn.execute(CREATE_STAGING)
+        raw = await conn.get_raw_connection()
+
+        async def flush(batch: dict[str, tuple]):
+            await raw.driver_connection.copy_records_to_table(
+                "product_import", records=list(batch.values()), columns=IMPORT_COLUMNS
+            )
+            result = await conn.execute(UPSERT_FROM_STAGING)
+            await conn.execute(TRUNCATE_STAGING)
+            report["upserted"] += result.rowcount
+            logger.info("Product import: %(processed)s processed, %(upserted)s upserted, %(failed)s failed", report)
+
+        # Ключ - sku: повтор артикула в одной пачке сломал бы ON CONFLICT, побеждает последний
+        batch: dict[str, tuple] = {}
+        async for line_number, record in records:
+            report["processed"] += 1
+            try:
+                if isinstance(record, str):
+                    raise ValueError(record)
+                row = _to_row(record)
+            except ValueError as e:
+                report["failed"] += 1
+                if len(report["errors"]) < MAX_REPORTED_ERRORS:
+                    report["errors"].append({"line": line_number, "error": str(e)})
+                continue
+            batch[row[0]] = row
+            if len(batch) >= settings.PRODUCT_IMPORT_BATCH_SIZE:
+                await flush(batch)
+                batch = {}
+        if batch:
+            await flush(batch)
+
+    return report
@@ -0,0 +1,180 @@
+import math
+import time
+from collections import OrderedDict
+
+from fastapi import HTTPException, Request, status
+
+from app.config import settings
+from app.metrics import Counter, registry
+
+rate_limited_total = registry.register(Counter(
+    "rate_limited_total", "Requests rejected by the rate limiter", ("scope", "key_type")
+))
+
+
+def retry_after(previous: int, current: int, elapsed: float, window: float, limit: int) -> float:
+    """
+    Через сколько секунд запрос пройдёт по скользящему окну: вес прошлого окна
+    убывает линейно, оценка - previous * (1 - elapsed / window) + current
+    """
+    if current + 1 <= limit:
+        # В текущем окне место есть, ждём, пока «остынет» прошлое
+        return max(window * (1 - (limit - current - 1) / previous) - elapsed, 0.0)
+    # Ждём следующего окна, где текущее станет прошлым
+    wait = window - elapsed
+    if limit > 1:
+        wait += window * max(1 - (limit - 1) / current, 0.0)
+    else:
+        wait += window
+    return wait
+
+
+class RateLimitStore:
+    """
+    Хранилище счётчиков. hit засчитывает запрос и возвращает, сколько ждать,
+    или None, если запрос укладывается в лимит
+    """
+
+    async def hit(self, key: str, limit: int, window: float) -> float | None:
+        raise NotImplementedError
+
+
+class LocalRateLimitStore(RateLimitStore):
+    """
+    Скользящее окно из двух корзин: на ключ хранится [номер окна, счётчик текущего,
+    счётчик прошлого] - O(1) памяти независимо от числа запросов. Ключей не больше
+    maxsize, давно не встречавшиеся вытесняются первыми
+    """
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._state: OrderedDict[str, list] = OrderedDict()
+
+    async def hit(self, key: str, limit: int, window: float) -> float | None:
+        now = time.time()
+        index = int(now // window)
+        state = self._state.get(key)
+        if state is None:
+            state = self._state[key] = [index, 0, 0]
+            while len(self._state) > self.maxsize:
+                self._state.popitem(last=False)
+        else:
+            self._state.move_to_end(key)
+            if state[0] != index:
+                # Прошлым становится предыдущее окно, если оно было соседним, иначе оно пустое
+                state[2] = state[1] if state[0] == index - 1 else 0
+                state[1] = 0
+                state[0] = index
+
+        _, current, previous = state
+        elapsed = now - index * window
+        if previous * (1 - elapsed / window) + current + 1 > limit:
+            # Отклонённые запросы не считаем: клиент, переставший ломиться, быстро разблокируется
+            return retry_after(previous, current, elapsed, window, limit)
+        state[1] += 1
+        return None
+
+    def __len__(self):
+        return len(self._state)
+
+
+class RedisRateLimitStore(RateLimitStore):
+    """
+    Общие для всех воркеров счётчики: по ключу Redis на окно, INCR и GET прошлого
+    окна одной транзакцией. Здесь считаются и отклонённые запросы
+    """
+
+    def __init__(self, url: str):
+        # redis нужен только при общем хранилище
+        from redis import asyncio as redis
+
+        self.client = redis.from_url(url)
+
+    async def hit(self, key: str, limit: int, window: float) -> float | None:
+        now = time.time()
+        index = int(now // window)
+        current_key = f"ratelimit:{key}:{index}"
+        async with self.client.pipeline(transaction=True) as pipe:
+            pipe.incr(current_key)
+            pipe.expire(current_key, math.ceil(window * 2))
+            pipe.get(f"ratelimit:{key}:{index - 1}")
+            current, _, previous = await pipe.execute()
+
+        current, previous = int(current) - 1, int(previous or 0)
+        elapsed = now - index * window
+        if previous * (1 - elapsed / window) + current + 1 > limit:
+            return retry_after(previous, current, elapsed, window, limit)
+        return None
+
+
+def get_rate_limit_store() -> RateLimitStore:
+    url = settings.RATE_LIMIT_URL
+    if not url:
+        return LocalRateLimitStore(maxsize=settings.RATE_LIMIT_SIZE)
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        return RedisRateLimitStore(url)
+    raise ValueError(f"Unsupported RATE_LIMIT_URL: {url}")
+
+
+store = get_rate_limit_store()
+
+
+def client_ip(request: Request) -> str:
+    """
+    Каждый прокси дописывает в X-Forwarded-For адрес своего клиента справа, а всё левее
+    мог прислать сам клиент. Поэтому берём запись, добавленную самым дальним из
+    RATE_LIMIT_TRUSTED_PROXIES доверенных прокси
+    """
+    hops = settings.RATE_LIMIT_TRUSTED_PROXIES
+    if hops > 0:
+        forwarded = [
+            address.strip()
+            for header in request.headers.getlist("x-forwarded-for")
+            for address in header.split(",")
+        ]
+        if len(forwarded) >= hops and forwarded[-hops]:
+            return forwarded[-hops]
+    return request.client.host if request.client else "unknown"
+
+
+async def request_email(request: Request) -> str | None:
+    """
+    email из JSON или формы. FastAPI к этому моменту уже прочитал тело для
+    параметров маршрута, так что повторного чтения нет
+    """
+    try:
+        if request.headers.get("content-type", "").startswith("application/json"):
+            data = await request.json()
+        else:
+            data = await request.form()
+    except Exception:
+        return None
+    email = data.get("email") if hasattr(data, "get") else None
+    return email.strip().lower() if isinstance(email, str) and email.strip() else None
+
+
+def rate_limit(scope: str):
+    """
+    Зависимость с лимитами на IP и на email из тела запроса. При превышении - 429
+    с Retry-After. Ставится раньше login_slot, чтобы отсекать перебор до очереди bcrypt
+    """
+
+    async def dependency(request: Request):
+        if not settings.RATE_LIMIT_ENABLED:
+            return
+        keys = [("ip", client_ip(request), settings.RATE_LIMIT_IP)]
+        email = await request_email(request)
+        if email is not None:
+            keys.append(("email", email, settings.RATE_LIMIT_EMAIL))
+
+        for key_type, value, limit in keys:
+            wait = await store.hit(f"{scope}:{key_type}:{value}", limit, settings.RATE_LIMIT_WINDOW)
+            if wait is not None:
+                rate_limited_total.inc(scope, key_type)
+                raise HTTPException(
+                    status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                    detail="Too many attempts, try again later",
+                    headers={"Retry-After": str(max(math.ceil(wait), 1))},
+                )
+
+    return dependency
@@ -1,14 +1,24 @@
-from typing import List
+from typing import Iterable, List
 
-from sqlalchemy import select, func
+from sqlalchemy import select, insert, update, delete, func, tuple_, text, any_, literal, Integer
+from sqlalchemy.dialects.postgresql import ARRAY
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import joinedload
 
-from app.database import async_session
+from app.cache import LRUCache
+from app.config import settings
+from app.database import request_session, use_session
+from app.repository.schemas import CountMode
+
+# Кэш результатов count(), ключ - (таблица, отрендеренный фильтр)
+count_cache = LRUCache(maxsize=settings.COUNT_CACHE_SIZE, ttl=settings.COUNT_CACHE_TTL)
 
 
 class BaseRepository:
     model = None
+    # Поля, по которым разрешена keyset-пагинация. Для каждого поля должен быть
+    # индекс (field, id), иначе глубокие страницы превратятся в полный скан
+    sortable_fields = ("id",)
 
     @classmethod
     def build_joinedload(cls, include: str):
@@ -21,68 +31,138 @@ class BaseRepository:
         return option
 
     @classmethod
-    async def get_all(cls):
-        async with async_session() as session:
+    async def _save(cls, session: AsyncSession):
+        # Сессию запроса коммитит get_session после обработчика, здесь только flush,
+        # чтобы весь запрос шёл в одной транзакции на одном подключении
+        if session is request_session.get():
+            await session.flush()
+        else:
+            await session.commit()
+
+    @classmethod
+    async def get_all(cls, session: AsyncSession = None):
+        async with use_session(session) as session:
             query = select(cls.model)
             result = await session.execute(query)
             return result.scalars().all()
 
     @classmethod
-    async def get_by_id(cls, id):
-        async with async_session() as session:
+    async def get_by_id(cls, id, session: AsyncSession = None):
+        async with use_session(session) as session:
             query = select(cls.model).filter_by(id=id)
             result = await session.execute(query)
             return result.scalar_one_or_none()
 
     @classmethod
-    async def get_by(cls, **filters):
-        async with async_session() as session:
+    async def get_by(cls, session: AsyncSession = None, **filters):
+        async with use_session(session) as session:
             query = select(cls.model).filter_by(**filters)
             result = await session.execute(query)
             return result.scalar_one_or_none()
 
     @classmethod
     async def create(cls, session: AsyncSession, **data):
-        instance = cls.model(**data)
-        session.add(instance)
-        await session.commit()
-        await session.refresh(instance)
+        # INSERT ... RETURNING сразу отдаёт id и серверные значения, refresh не нужен
+        query = insert(cls.model).values(**data).returning(cls.model)
+        result = await session.scalars(query)
+        instance = result.one()
+        await cls._save(session)
         return instance
 
     @classmethod
-    async def update(cls, id, data: dict):
-        async with async_session() as session:
-            query = select(cls.model).filter_by(id=id)
-            result = await session.execute(query)
-            instance = result.scalar_one_or_none()
+    async def update(cls, id, data: dict, session: AsyncSession = None):
+        if not data:
+            return await cls.get_by_id(id, session=session)
+        async with use_session(session) as session:
+            # Один UPDATE ... RETURNING вместо SELECT, UPDATE и refresh
+            query = (
+                update(cls.model)
+                .filter_by(id=id)
+                .values(**data)
+                .returning(cls.model)
+                .execution_options(populate_existing=True)
+            )
+            result = await session.scalars(query)
+            instance = result.one_or_none()
             if not instance:
                 return None
-            for key, value in data.items():
-                setattr(instance, key, value)
-            session.add(instance)
-            await session.commit()
-            await session.refresh(instance)
+            await cls._save(session)
             return instance
 
     @classmethod
     async def destroy(cls, id, session: AsyncSession):
-        query = select(cls.model).filter_by(id=id)
+        # Без предварительной выборки; связанные строки удаляют каскады внешних ключей
+        query = delete(cls.model).filter_by(id=id).returning(cls.model.id)
         result = await session.execute(query)
-        instance = result.scalar_one_or_none()
-
-        if not instance:
+        if result.scalar_one_or_none() is None:
             return None
 
-        await session.delete(instance)
-        await session.commit()
+        await cls._save(session)
         return {
             "message": "Successfully deleted"
         }
 
     @classmethod
-    async def paginate(cls, page: int, limit: int, filter=None, includes: List[str] = None):
-        async with async_session() as session:
-            query = select(cls.model).limit(limit).offset((page - 1) * limit)
+    def _id_in(cls, ids: Iterable[int]):
+        # id = ANY(:ids) - один параметр-массив вместо IN (:1, :2, ...), план не зависит от размера
+        return cls.model.id == any_(literal(list(ids), ARRAY(Integer)))
+
+    @classmethod
+    async def get_many(cls, ids: Iterable[int], session: AsyncSession = None):
+        ids = list(ids)
+        if not ids:
+            return []
+        async with use_session(session) as session:
+            query = select(cls.model).filter(cls._id_in(ids))
+            result = await session.execute(query)
+            return result.scalars().all()
+
+    @classmethod
+    async def create_many(cls, rows: List[dict], session: AsyncSession = None):
+        """
+        INSERT ... RETURNING пачками (insertmanyvalues), объекты сразу попадают в identity map
+        """
+        if not rows:
+            return []
+        async with use_session(session) as session:
+            result = await session.scalars(insert(cls.model).returning(cls.model), rows)
+            instances = result.all()
+            await cls._save(session)
+            return instances
+
+    @classmethod
+    async def update_many(cls, rows: List[dict], session: AsyncSession = None) -> int:
+        """
+        Массовый UPDATE по первичному ключу: в каждом словаре обязателен id,
+        остальные ключи - новые значения этой строки
+        """
+        if not rows:
+            return 0
+        async with use_session(session) as session:
+            await session.execute(update(cls.model), rows)
+            await cls._save(session)
+            return len(rows)
+
+    @classmethod
+    async def delete_many(cls, ids: Iterable[int], session: AsyncSession = None) -> int:
+        """
+        Один DELETE ... WHERE id = ANY(...) без предварительной выборки; каскады делает БД
+        """
+        ids = list(ids)
+        if not ids:
+            return 0
+        async with use_session(session) as session:
+            query = delete(cls.model).filter(cls._id_in(ids)).execution_options(synchronize_session=False)
+            result = await session.execute(query)
+            await cls._save(session)
+            return result.rowcount
+
+    @classmethod
+    async def paginate(
+        cls, page: int, limit: int, filter=None, includes: List[str] = None, session: AsyncSession = None
+    ):
+        async with use_session(session) as session:
+            query = select(cls.model).order_by(cls.model.id).limit(limit).offset((page - 1) * limit)
             if includes:
                 for include in includes:
                     query = query.options(cls.build_joinedload(include))
@@ -92,11 +172,97 @@ class BaseRepository:
             return result.unique().scalars().all()
 
     @classmethod
-    async def count(cls, filter=None):
-        async with async_session() as session:
+    async def paginate_by_cursor(
+        cls,
+        limit: int,
+        after: tuple = None,
+        sort_key: str = "id",
+        filter=None,
+        includes: List[str] = None,
+        session: AsyncSession = None
+    ):
+        """
+        Keyset-пагинация по паре (sort_key, id): вместо OFFSET продолжаем с последней
+        отданной строки, поэтому стоимость запроса не зависит от номера страницы.
+        Возвращает строки страницы и ключ (value, id) для следующей или None.
+        """
+        if sort_key not in cls.sortable_fields:
+            raise ValueError(f"Sorting by '{sort_key}' is not allowed")
+
+        sort_column = getattr(cls.model, sort_key)
+        async with use_session(session) as session:
+            # Берём на одну строку больше, чтобы узнать, есть ли следующая страница
+            query = select(cls.model).order_by(sort_column, cls.model.id).limit(limit + 1)
+            if after is not None:
+                value, last_id = after
+                try:
+                    value = sort_column.type.python_type(value)
+                except (TypeError, ValueError, ArithmeticError) as e:
+                    raise ValueError("Invalid cursor") from e
+                query = query.filter(tuple_(sort_column, cls.model.id) > tuple_(value, last_id))
+            if includes:
+                for include in includes:
+                    query = query.options(cls.build_joinedload(include))
+            if filter is not None:
+                query = query.filter(filter)
+            result = await session.execute(query)
+            rows = result.unique().scalars().all()
+
+        if len(rows) <= limit:
+            return rows, None
+        rows = rows[:limit]
+        last = rows[-1]
+        return rows, (getattr(last, sort_key), last.id)
+
+    @classmethod
+    async def count(cls, filter=None, count_mode: CountMode = CountMode.exact, session: AsyncSession = None):
+        """
+        Количество строк модели. count_mode:
+        exact - честный count(id);
+        estimated - оценка планировщика (pg_class.reltuples или EXPLAIN для фильтра);
+        cached - точное значение, закэшированное на COUNT_CACHE_TTL секунд;
+        none - не считать вовсе, возвращает None
+        """
+        if count_mode == CountMode.none:
+            return None
+
+        if count_mode == CountMode.cached:
+            key = (cls.model.__tablename__, cls._render_filter(filter))
+            total = count_cache.get(key)
+            if total is None:
+                total = await cls.count(filter=filter, session=session)
+                count_cache.set(key, total)
+            return total
+
+        async with use_session(session) as session:
+            if count_mode == CountMode.estimated:
+                estimate = await cls._estimate_count(session, filter)
+                # Таблица ещё ни разу не анализировалась - оценки нет
+                if estimate is not None and estimate >= 0:
+                    return estimate
+
             if filter is not None:
                 query = select(func.count(cls.model.id)).filter(filter)
             else:
                 query = select(func.count(cls.model.id))
             result = await session.execute(query)
             return result.scalar()
+
+    @classmethod
+    async def _estimate_count(cls, session: AsyncSession, filter=None):
+        if filter is None:
+            query = text("SELECT reltuples::bigint FROM pg_class WHERE oid = CAST(:table AS regclass)")
+            result = await session.execute(query, {"table": cls.model.__tablename__})
+            return result.scalar()
+
+        query = select(cls.model.id).filter(filter)
+        compiled = query.compile(dialect=session.bind.dialect, compile_kwargs={"literal_binds": True})
+        result = await session.execute(text(f"EXPLAIN (FORMAT JSON) {compiled}"))
+        plan = result.scalar()
+        return int(plan[0]["Plan"]["Plan Rows"])
+
+    @classmethod
+    def _render_filter(cls, filter) -> str:
+        if filter is None:
+            return ""
+        return str(filter.compile(compile_kwargs={"literal_binds": True}))
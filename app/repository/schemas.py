@@ -1,8 +1,38 @@
-from pydantic import BaseModel
+from decimal import Decimal
+from enum import Enum
+from typing import Annotated, Generic, TypeVar
 
+from pydantic import BaseModel, Field, PlainSerializer
 
-class SBaseListResponse(BaseModel):
+# Деньги храним как Numeric(12, 2) и считаем в Decimal, а в JSON отдаём числом
+Money = Annotated[
+    Decimal,
+    Field(max_digits=12, decimal_places=2),
+    PlainSerializer(float, return_type=float, when_used="json"),
+]
+
+T = TypeVar("T")
+
+
+class CountMode(str, Enum):
+    exact = "exact"
+    estimated = "estimated"
+    cached = "cached"
+    none = "none"
+
+
+# Параметризуются схемой элемента: SBaseListResponse[SRProduct] валидирует строки
+# из ORM один раз и сериализуется pydantic-core без обхода нетипизированного list
+class SBaseListResponse(BaseModel, Generic[T]):
     page: int
-    total: int
+    total: int | None
+    limit: int
+    count_mode: CountMode = CountMode.exact
+    data: list[T]
+
+
+class SCursorListResponse(BaseModel, Generic[T]):
     limit: int
-    data: list
+    sort: str
+    next_cursor: str | None
+    data: list[T]
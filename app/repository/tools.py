@@ -1,8 +1,65 @@
+import asyncio
+import base64
+import json
 
-async def get_list_data(model, page: int, limit: int, filter=None):
+from sqlalchemy.exc import IntegrityError
+
+from app.database import async_session
+from app.repository.schemas import CountMode
+
+
+async def get_list_data(model, page: int, limit: int, filter=None, count_mode: CountMode = CountMode.exact):
+    """
+    Страница и count независимы - запрашиваем их параллельно. Одна сессия (и сессия
+    запроса тоже) не выполняет два запроса одновременно, поэтому count идёт в своей
+    сессии на отдельном подключении из пула
+    """
+    async def count():
+        if count_mode == CountMode.none:
+            return None
+        # Подключение берётся только при реальном запросе: попадание в кэш count его не трогает
+        async with async_session() as session:
+            return await model.count(filter=filter, count_mode=count_mode, session=session)
+
+    data, total = await asyncio.gather(
+        model.paginate(page=page, limit=limit, filter=filter),
+        count(),
+    )
     return {
-        'data': await model.paginate(page=page, limit=limit, filter=filter),
-        'total': await model.count(filter=filter),
+        'data': data,
+        'total': total,
         'page': page,
-        'limit': limit
+        'limit': limit,
+        'count_mode': count_mode
     }
+
+
+def encode_cursor(sort_key: str, after: tuple) -> str:
+    """
+    Упаковывает ключ (value, id) последней строки в непрозрачную для клиента строку
+    """
+    # Decimal и прочие не-JSON значения уходят строкой, тип восстанавливает репозиторий
+    raw = json.dumps([sort_key, *after], separators=(",", ":"), default=str).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[str, tuple]:
+    """
+    Обратная операция к encode_cursor. Бросает ValueError на испорченном курсоре
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        sort_key, value, id = json.loads(raw)
+    except (ValueError, TypeError) as e:
+        raise ValueError("Invalid cursor") from e
+    if not isinstance(id, int):
+        raise ValueError("Invalid cursor")
+    return sort_key, (value, id)
+
+
+def is_unique_violation(error: IntegrityError, constraint: str) -> bool:
+    """
+    IntegrityError из-за именно этого уникального ограничения: имя ограничения
+    лежит в исходном исключении asyncpg
+    """
+    return getattr(error.orig.__cause__, "constraint_name", None) == constraint
@@ -0,0 +1,39 @@
+from decimal import Decimal
+from typing import Any
+
+import orjson
+from fastapi import Response, status
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+
+def _default(value: Any):
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, BaseModel):
+        return value.model_dump(mode="json")
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+
+class ORJSONResponse(JSONResponse):
+    """
+    Ответ по умолчанию для всех роутеров: orjson вместо стандартного json
+    """
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS)
+
+
+def model_response(
+    model: BaseModel, status_code: int = status.HTTP_200_OK, headers: dict | None = None
+) -> Response:
+    """
+    Готовая модель сериализуется pydantic-core сразу в байты. Возвращаем Response,
+    поэтому FastAPI не валидирует её повторно по response_model и не гоняет через jsonable_encoder
+    """
+    return Response(
+        content=model.__pydantic_serializer__.to_json(model),
+        status_code=status_code,
+        media_type="application/json",
+        headers=headers,
+    )
@@ -1,12 +1,22 @@
+import asyncio
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+
 from passlib.context import CryptContext
 from datetime import datetime, timedelta
+from uuid import uuid4
+from fastapi import Response
 from jose import jwt
 from app.config import settings
+from app.user.tokens import signing_key
 
 password_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-KEY = settings.KEY
 ALGORITHM = settings.ALGORITHM
 TOKEN_EXPIRE = settings.TOKEN_EXPIRE
+REFRESH_COOKIE_PATH = "/user/refresh"
+
+_hash_executor: Executor | None = None
+# Сколько операций bcrypt сейчас ждут или выполняются в пуле
+hash_queue_depth = 0
 
 
 def get_hashed_password(password: str):
@@ -17,7 +27,78 @@ def verify_password(password: str, hashed_password: str):
     return password_context.verify(password, hashed_password)
 
 
-def create_access_token(user_id: int):
-    expire = datetime.utcnow() + timedelta(minutes=TOKEN_EXPIRE)
-    to_encode = {"user_id": user_id, "exp": expire}
-    return jwt.encode(to_encode, KEY, algorithm=ALGORITHM)
+def get_hash_executor() -> Executor:
+    global _hash_executor
+    if _hash_executor is None:
+        if settings.AUTH_HASH_EXECUTOR == "process":
+            _hash_executor = ProcessPoolExecutor(max_workers=settings.AUTH_HASH_WORKERS)
+        else:
+            _hash_executor = ThreadPoolExecutor(
+                max_workers=settings.AUTH_HASH_WORKERS, thread_name_prefix="bcrypt"
+            )
+    return _hash_executor
+
+
+async def _run_hash(func, *args):
+    """
+    bcrypt специально медленный (~250 мс), поэтому выполняем его в ограниченном пуле,
+    а не в event loop. AUTH_HASH_EXECUTOR=inline возвращает старое поведение
+    """
+    global hash_queue_depth
+    if settings.AUTH_HASH_EXECUTOR == "inline":
+        return func(*args)
+    hash_queue_depth += 1
+    try:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(get_hash_executor(), func, *args)
+    finally:
+        hash_queue_depth -= 1
+
+
+async def get_hashed_password_async(password: str):
+    return await _run_hash(get_hashed_password, password)
+
+
+async def verify_password_async(password: str, hashed_password: str):
+    return await _run_hash(verify_password, password, hashed_password)
+
+
+def _create_token(user_id: int, token_version: int, token_type: str, expire_minutes: int, **claims):
+    expire = datetime.utcnow() + timedelta(minutes=expire_minutes)
+    to_encode = {
+        **claims,
+        "user_id": user_id,
+        "ver": token_version,
+        "type": token_type,
+        "jti": uuid4().hex,
+        "exp": expire,
+    }
+    return jwt.encode(to_encode, signing_key, algorithm=ALGORITHM)
+
+
+def create_access_token(user_id: int, token_version: int, **claims):
+    return _create_token(user_id, token_version, "access", TOKEN_EXPIRE, **claims)
+
+
+def create_refresh_token(user_id: int, token_version: int):
+    return _create_token(user_id, token_version, "refresh", settings.REFRESH_TOKEN_EXPIRE)
+
+
+def issue_tokens(response: Response, user_id: int, token_version: int, **claims) -> dict:
+    """
+    Новая пара access/refresh: в cookie и в теле ответа. Refresh-cookie уходит
+    только на /user/refresh
+    """
+    access_token = create_access_token(user_id, token_version, **claims)
+    refresh_token = create_refresh_token(user_id, token_version)
+    response.set_cookie(key="token", value=access_token, httponly=True, secure=True, samesite="lax")
+    response.set_cookie(
+        key="refresh_token",
+        value=refresh_token,
+        httponly=True,
+        secure=True,
+        samesite="strict",
+        path=REFRESH_COOKIE_PATH,
+        max_age=settings.REFRESH_TOKEN_EXPIRE * 60,
+    )
+    return {"auth_token": access_token, "refresh_token": refresh_token}
@@ -0,0 +1,10 @@
+from app.cache import Cache, shared_backend
+from app.config import settings
+
+# user_id -> SAuthUser.model_dump(), чтобы не ходить в БД на каждый авторизованный запрос
+user_cache = Cache(
+    "user",
+    maxsize=settings.USER_CACHE_SIZE,
+    ttl=settings.USER_CACHE_TTL,
+    backend=shared_backend,
+)
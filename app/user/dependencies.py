@@ -1,10 +1,18 @@
-from fastapi import Depends, HTTPException, Request
-from jose import jwt, JWTError, ExpiredSignatureError
+import asyncio
+
+from fastapi import Depends, HTTPException, Request, status
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database import after_commit, get_session
+from app.user.cache import user_cache
 from app.user.repository import UserRepository
+from app.user.revocation import DELETED, denylist, token_versions
+from app.user.schemas import SAuthUser
+from app.user.tokens import InvalidToken, TokenExpired, decode
 from app.config import settings
 
-KEY = settings.KEY
-ALGORITHM = settings.ALGORITHM
+_login_semaphore = asyncio.Semaphore(settings.AUTH_LOGIN_CONCURRENCY)
+_login_waiting = 0
 
 
 def get_token(request: Request):
@@ -20,17 +28,130 @@ def get_token(request: Request):
     return token
 
 
-async def get_current_user(token: str = Depends(get_token)):
+def decode_token(token: str) -> dict:
     try:
-        payload = jwt.decode(token, KEY, algorithms=[ALGORITHM])
-        user_id: int = payload.get("user_id")
-        if user_id is None:
-            raise HTTPException(status_code=401, detail="Invalid token")
-    except ExpiredSignatureError:
+        payload = decode(token)
+    except TokenExpired:
         raise HTTPException(status_code=401, detail="Token expired")
-    except JWTError:
+    except InvalidToken:
+        raise HTTPException(status_code=401, detail="Invalid token")
+    if payload.get("user_id") is None:
+        raise HTTPException(status_code=401, detail="Invalid token")
+    return payload
+
+
+async def get_token_version(user_id: int, session: AsyncSession) -> int:
+    """
+    Текущая версия токенов пользователя из кэша. При промахе пользователь читается
+    из БД целиком, заодно заполняя user_cache, так что запрос остаётся один
+    """
+    version = await token_versions.get(user_id)
+    if version is None:
+        user = await UserRepository.get_by_id(user_id, session=session)
+        if user is None:
+            version = DELETED
+        else:
+            version = user.token_version
+            await user_cache.set(user_id, SAuthUser.model_validate(user).model_dump())
+        await token_versions.set(user_id, version)
+    return version
+
+
+async def verify_token(token: str, session: AsyncSession, token_type: str = "access") -> dict:
+    """
+    Подпись и срок, тип токена, jti в списке отозванных (только для refresh) и версия
+    пользователя. В тёплом состоянии всё проверяется в памяти, без БД
+    """
+    payload = decode_token(token)
+    # Токены, выданные до появления type и ver, считаем access-токенами версии 0
+    if payload.get("type", "access") != token_type:
         raise HTTPException(status_code=401, detail="Invalid token")
-    user = await UserRepository.get_by_id(user_id)
+    if token_type == "refresh" and await denylist.is_revoked(payload.get("jti", "")):
+        raise HTTPException(status_code=401, detail="Token revoked")
+    if payload.get("ver", 0) != await get_token_version(payload["user_id"], session):
+        raise HTTPException(status_code=401, detail="Token revoked")
+    return payload
+
+
+async def load_user(user_id: int, session: AsyncSession) -> SAuthUser:
+    cached = await user_cache.get(user_id)
+    if cached is not None:
+        return SAuthUser.model_validate(cached)
+
+    user = await UserRepository.get_by_id(user_id, session=session)
     if user is None:
         raise HTTPException(status_code=404, detail="User not found")
-    return user
+    snapshot = SAuthUser.model_validate(user)
+    await user_cache.set(user_id, snapshot.model_dump())
+    return snapshot
+
+
+async def get_current_user(token: str = Depends(get_token), session: AsyncSession = Depends(get_session)):
+    payload = await verify_token(token, session)
+    return await load_user(payload["user_id"], session)
+
+
+async def get_current_user_readonly(token: str = Depends(get_token), session: AsyncSession = Depends(get_session)):
+    """
+    Для маршрутов только на чтение: при AUTH_TRUST_TOKEN_CLAIMS пользователь
+    собирается из claims токена без кэша пользователей и БД (версия токена всё равно проверяется)
+    """
+    payload = await verify_token(token, session)
+    if settings.AUTH_TRUST_TOKEN_CLAIMS and "name" in payload and "email" in payload:
+        return SAuthUser(id=payload["user_id"], name=payload["name"], email=payload["email"])
+    return await load_user(payload["user_id"], session)
+
+
+async def get_optional_user(request: Request, session: AsyncSession = Depends(get_session)) -> SAuthUser | None:
+    """
+    Для страниц, доступных и без входа: вместо 401 возвращает None
+    """
+    try:
+        return await get_current_user(get_token(request), session)
+    except HTTPException:
+        return None
+
+
+async def invalidate_user(user_id: int):
+    await user_cache.delete(user_id)
+
+
+def invalidate_user_on_commit(session: AsyncSession, user_id: int):
+    """
+    Сброс после коммита: иначе параллельный запрос успеет положить в кэш старую строку
+    """
+    async def callback():
+        await invalidate_user(user_id)
+
+    after_commit(session, callback)
+
+
+def _login_overloaded():
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Too many login attempts, try again later",
+        headers={"Retry-After": "1"},
+    )
+
+
+async def login_slot():
+    """
+    Ограничивает число одновременных проверок пароля. Лишние запросы ждут в
+    очереди ограниченной длины, а при её переполнении сразу получают 503
+    """
+    global _login_waiting
+    if _login_semaphore.locked() and _login_waiting >= settings.AUTH_LOGIN_QUEUE_SIZE:
+        raise _login_overloaded()
+
+    _login_waiting += 1
+    try:
+        await asyncio.wait_for(_login_semaphore.acquire(), timeout=settings.AUTH_LOGIN_QUEUE_TIMEOUT)
+    except asyncio.TimeoutError:
+        raise _login_overloaded()
+    finally:
+        _login_waiting -= 1
+
+    try:
+        yield
+    finally:
+        _login_semaphore.release()
@@ -1,6 +1,6 @@
 from typing import List
 
-from sqlalchemy import String
+from sqlalchemy import Integer, String
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from app.database import Base
@@ -12,6 +12,8 @@ class User(Base):
     name: Mapped[str] = mapped_column(String, index=True)
     email: Mapped[str] = mapped_column(String, unique=True, index=True)
     hashed_password: Mapped[str] = mapped_column(String(256))
+    # Увеличивается при выходе и смене пароля: все выданные ранее токены становятся недействительны
+    token_version: Mapped[int] = mapped_column(Integer, default=0, server_default="0", nullable=False)
 
 
     # One to many
@@ -1,6 +1,17 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+
 from app.repository.base import BaseRepository
 from app.user.models import User
 
 
 class UserRepository(BaseRepository):
     model = User
+
+    @classmethod
+    async def bump_token_version(cls, user_id: int, session: AsyncSession = None) -> int | None:
+        """
+        Отзывает все выданные пользователю токены. Возвращает новую версию
+        или None, если пользователя нет
+        """
+        user = await cls.update(user_id, {"token_version": User.token_version + 1}, session=session)
+        return user.token_version if user else None
@@ -0,0 +1,94 @@
+import heapq
+import time
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.cache import Cache, CacheBackend, shared_backend
+from app.config import settings
+from app.database import after_commit
+
+# Версия токенов пользователя: токен с другим ver отозван. Увеличение версии отзывает
+# разом все токены пользователя (выход, смена пароля, удаление). С общим backend другие
+# воркеры узнают о новой версии не позже чем через AUTH_TOKEN_VERSION_TTL
+token_versions = Cache(
+    "token_version",
+    maxsize=settings.USER_CACHE_SIZE,
+    ttl=settings.AUTH_TOKEN_VERSION_TTL,
+    backend=shared_backend,
+)
+# Версия удалённого пользователя: не совпадает ни с одним выданным токеном
+DELETED = -1
+
+
+class ExpiringSet:
+    """
+    Множество с временем жизни у каждого элемента. Проверка - один поиск в dict,
+    просроченные элементы вычищаются по куче при добавлении. В отличие от LRU,
+    ничего не вытесняется раньше срока: отозванный токен не может «ожить»
+    """
+
+    def __init__(self):
+        self._expires: dict[str, float] = {}
+        self._heap: list[tuple[float, str]] = []
+
+    def add(self, value: str, expires_at: float):
+        self._purge()
+        self._expires[value] = expires_at
+        heapq.heappush(self._heap, (expires_at, value))
+
+    def __contains__(self, value: str) -> bool:
+        expires_at = self._expires.get(value)
+        return expires_at is not None and expires_at > time.time()
+
+    def __len__(self):
+        return len(self._expires)
+
+    def _purge(self):
+        now = time.time()
+        while self._heap and self._heap[0][0] <= now:
+            expires_at, value = heapq.heappop(self._heap)
+            if self._expires.get(value) == expires_at:
+                del self._expires[value]
+
+
+class TokenDenylist:
+    """
+    Отозванные jti до истечения срока их токенов: локально и, если настроен, в общем backend
+    """
+
+    def __init__(self, backend: CacheBackend = None):
+        self.local = ExpiringSet()
+        self.backend = backend
+
+    async def revoke(self, jti: str, expires_at: float) -> bool:
+        """
+        False, если этот jti уже отозван в этом процессе. Проверка и добавление идут
+        без await между ними, поэтому из двух одновременных запросов с одним
+        refresh-токеном пройдёт только один
+        """
+        if jti in self.local:
+            return False
+        self.local.add(jti, expires_at)
+        if self.backend is not None:
+            await self.backend.set(f"revoked:{jti}", b"1", expires_at - time.time())
+        return True
+
+    async def is_revoked(self, jti: str) -> bool:
+        if jti in self.local:
+            return True
+        if self.backend is not None:
+            return await self.backend.get(f"revoked:{jti}") is not None
+        return False
+
+
+denylist = TokenDenylist(shared_backend)
+
+
+def revoke_user_tokens_on_commit(session: AsyncSession, user_id: int, version: int):
+    """
+    Новая версия попадает в кэш только после коммита: при откате старые токены остаются в силе
+    """
+    async def callback():
+        await token_versions.set(user_id, version)
+
+    after_commit(session, callback)
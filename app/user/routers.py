@@ -1,13 +1,18 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Response
-from sqlalchemy.future import select
+from fastapi import APIRouter, Depends, HTTPException, Request, status, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.database import get_session
-from app.user.auth import get_hashed_password, verify_password, create_access_token
-from app.user.dependencies import get_current_user
+from app.ratelimit import rate_limit
+from app.responses import model_response
+from app.user.auth import REFRESH_COOKIE_PATH, get_hashed_password_async, verify_password_async, issue_tokens
+from app.user.dependencies import (
+    get_current_user, get_current_user_readonly, get_optional_user, invalidate_user_on_commit, load_user,
+    login_slot, verify_token
+)
 from app.user.models import User
 from app.user.repository import UserRepository
-from app.user.schemas import SRUser, SCUser, SAuth, SUUserUpdate
+from app.user.revocation import DELETED, denylist, revoke_user_tokens_on_commit
+from app.user.schemas import SRUser, SCUser, SAuth, SAuthRefresh, SUUserUpdate, SAuthUser
 
 router = APIRouter(
     prefix="/user",
@@ -15,51 +20,73 @@ router = APIRouter(
 )
 
 
-@router.post("/register", response_model=SRUser, status_code=status.HTTP_201_CREATED)
+@router.post(
+    "/register",
+    response_model=SRUser,
+    status_code=status.HTTP_201_CREATED,
+    dependencies=[Depends(rate_limit("register")), Depends(login_slot)],
+)
 async def register_user(data: SCUser, session: AsyncSession = Depends(get_session)):
     """
     Регистрация аккаунта
     """
-    existing_user = await UserRepository.get_by(email=data.email)
+    existing_user = await UserRepository.get_by(session=session, email=data.email)
     if existing_user:
         raise HTTPException(status_code=400, detail="Email already registered")
 
-    hashed_password = get_hashed_password(data.password)
+    hashed_password = await get_hashed_password_async(data.password)
     user = await UserRepository.create(
         session=session,
         name=data.name,
         email=data.email,
         hashed_password=hashed_password,
     )
-    return SRUser.from_orm(user)
+    return model_response(SRUser.model_validate(user), status_code=status.HTTP_201_CREATED)
 
 
-@router.post("/login")
-async def login(data: SAuth, response: Response):
+@router.post("/login", dependencies=[Depends(rate_limit("login")), Depends(login_slot)])
+async def login(data: SAuth, response: Response, session: AsyncSession = Depends(get_session)):
     """
     Вход в свой аккаунт
     """
-    user = await UserRepository.get_by(email=data.email)
-    if user is None or not verify_password(data.password, user.hashed_password):
+    user = await UserRepository.get_by(session=session, email=data.email)
+    if user is None or not await verify_password_async(data.password, user.hashed_password):
         raise HTTPException(status_code=400, detail="Incorrect email or password")
 
-    token = create_access_token(user.id)
-    response.set_cookie(
-        key="token",
-        value=token,
-        httponly=True,
-        secure=True,
-        samesite="lax",
-    )
-    return {"message": "Successfully logged in", "auth_token": token}
+    tokens = issue_tokens(response, user.id, user.token_version, name=user.name, email=user.email)
+    return {"message": "Successfully logged in", **tokens}
+
+
+@router.post("/refresh")
+async def refresh_tokens(
+    request: Request,
+    response: Response,
+    data: SAuthRefresh | None = None,
+    session: AsyncSession = Depends(get_session),
+):
+    """
+    Новая пара токенов по refresh-токену из тела или cookie. Использованный
+    refresh-токен отзывается, повторно его предъявить нельзя
+    """
+    token = (data.refresh_token if data else None) or request.cookies.get("refresh_token")
+    if not token:
+        raise HTTPException(status_code=401, detail="Token is missing")
+
+    payload = await verify_token(token, session, token_type="refresh")
+    if not await denylist.revoke(payload["jti"], payload["exp"]):
+        raise HTTPException(status_code=401, detail="Token revoked")
+
+    user = await load_user(payload["user_id"], session)
+    tokens = issue_tokens(response, user.id, payload["ver"], name=user.name, email=user.email)
+    return {"message": "Tokens refreshed", **tokens}
 
 
 @router.get("/current-user", response_model=SRUser)
-async def get_current_user_route(current_user: User = Depends(get_current_user)):
+async def get_current_user_route(current_user: SAuthUser = Depends(get_current_user_readonly)):
     """
     Получение текущего пользователя
     """
-    return current_user
+    return model_response(SRUser.model_validate(current_user.model_dump()))
 
 
 @router.put("/update_user/{user_id}", response_model=SRUser)
@@ -67,10 +94,11 @@ async def update_user(
     user_id: int,
     user_update: SUUserUpdate,
     session: AsyncSession = Depends(get_session),
-    current_user: User = Depends(get_current_user),
+    current_user: SAuthUser = Depends(get_current_user),
 ):
     """
-    Обновление данных пользователя
+    Обновление данных пользователя. Смена пароля отзывает все токены пользователя,
+    включая текущий, - после неё нужно войти заново
     """
     # Проверка, чтобы пользователь мог обновить только свои данные
     if current_user.id != user_id:
@@ -79,52 +107,43 @@ async def update_user(
             detail="Forbidden to update another user's data"
         )
 
-    # Получение пользователя по id
-    query = select(User).filter(User.id == user_id)
-    result = await session.execute(query)
-    user = result.scalar_one_or_none()
+    # Обновляем только те поля, которые указаны в запросе
+    user_data = user_update.model_dump(exclude_unset=True)
+    if "password" in user_data:
+        user_data["hashed_password"] = await get_hashed_password_async(user_data.pop("password"))
+        user_data["token_version"] = User.token_version + 1
 
+    # Один UPDATE ... RETURNING вместо SELECT + UPDATE
+    user = await UserRepository.update(user_id, user_data, session=session)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="User not found"
         )
+    invalidate_user_on_commit(session, user.id)
+    if "token_version" in user_data:
+        revoke_user_tokens_on_commit(session, user.id, user.token_version)
 
-    # Обновляем только те поля, которые указаны в запросе
-    user_data = user_update.dict(exclude_unset=True)
-    if "password" in user_data:
-        user_data["hashed_password"] = get_hashed_password(user_data.pop("password"))
-
-    for key, value in user_data.items():
-        setattr(user, key, value)
-
-    session.add(user)
-    await session.commit()
-    await session.refresh(user)
-
-    return SRUser.from_orm(user)
+    return model_response(SRUser.model_validate(user))
 
 
 @router.delete("/", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_user(
     session: AsyncSession = Depends(get_session),
-    current_user: User = Depends(get_current_user),
+    current_user: SAuthUser = Depends(get_current_user),
 ):
     """
     Автоматически удаляет текущего пользователя
     """
-    query = select(User).filter(User.id == current_user.id)
-    result = await session.execute(query)
-    user = result.scalar_one_or_none()
+    delete_result = await UserRepository.destroy(current_user.id, session)
 
-    if not user:
+    if delete_result is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="User not found or already deleted"
         )
-
-    await session.delete(user)
-    await session.commit()
+    invalidate_user_on_commit(session, current_user.id)
+    revoke_user_tokens_on_commit(session, current_user.id, DELETED)
 
     return {
         "message": "Successfully deleted"
@@ -132,11 +151,21 @@ async def delete_user(
 
 
 @router.post("/logout", status_code=status.HTTP_200_OK)
-async def logout(response: Response):
+async def logout(
+    response: Response,
+    session: AsyncSession = Depends(get_session),
+    current_user: SAuthUser | None = Depends(get_optional_user),
+):
     """
-    Выход с аккаунта текущего пользователя, удаление cookie с токеном.
+    Выход с аккаунта текущего пользователя: все его access- и refresh-токены
+    отзываются, cookie с токенами удаляются.
     """
+    if current_user is not None:
+        version = await UserRepository.bump_token_version(current_user.id, session=session)
+        if version is not None:
+            revoke_user_tokens_on_commit(session, current_user.id, version)
     response.delete_cookie("token")
+    response.delete_cookie("refresh_token", path=REFRESH_COOKIE_PATH)
     return {
         "message": "User logged out successfully"
     }
@@ -5,7 +5,7 @@ from typing_extensions import Optional
 class SGUser(BaseModel):
     name: str
     email: EmailStr
-    profile_picture: str | None
+    profile_picture: str | None = None
 
 
 class SCUser(SGUser):
@@ -28,6 +28,22 @@ class SRUser(SGUser):
         from_attributes = True
 
 
+class SAuthUser(BaseModel):
+    """
+    Снимок текущего пользователя, который кэшируется в get_current_user
+    """
+    id: int
+    name: str
+    email: EmailStr
+
+    class Config:
+        from_attributes = True
+
+
+class SAuthRefresh(BaseModel):
+    refresh_token: str | None = None  # Без тела - берётся из cookie
+
+
 class SAuth(BaseModel):
     username: str
     password: str
@@ -0,0 +1,80 @@
+import hashlib
+import time
+
+from jose import jwk, jwt, ExpiredSignatureError, JWTError
+
+from app.cache import LRUCache
+from app.config import settings
+
+ALGORITHM = settings.ALGORITHM
+
+# Ключ разбирается один раз при импорте, а не в каждом encode/decode
+# (python-jose иначе пробует json.loads и jwk.construct на каждый вызов)
+signing_key = jwk.construct(settings.KEY, ALGORITHM)
+
+# blake2b(токен) -> claims. Запись живёт до exp токена, поэтому повторно
+# предъявленный токен не декодируется и не проверяется HMAC/RSA заново
+verified_tokens = LRUCache(maxsize=settings.AUTH_TOKEN_CACHE_SIZE, ttl=0)
+
+
+class InvalidToken(Exception):
+    pass
+
+
+class TokenExpired(InvalidToken):
+    pass
+
+
+def _decode_jose(token: str) -> dict:
+    try:
+        return jwt.decode(token, signing_key, algorithms=[ALGORITHM])
+    except ExpiredSignatureError:
+        raise TokenExpired
+    except JWTError:
+        raise InvalidToken
+
+
+def _pyjwt_decoder():
+    # PyJWT необязателен и нужен только при AUTH_JWT_BACKEND=pyjwt
+    import jwt as pyjwt
+
+    # Для HS* это байты секрета, для RS*/ES* - уже загруженный публичный ключ
+    key = pyjwt.get_algorithm_by_name(ALGORITHM).prepare_key(settings.KEY)
+
+    def decode(token: str) -> dict:
+        try:
+            return pyjwt.decode(token, key, algorithms=[ALGORITHM])
+        except pyjwt.ExpiredSignatureError:
+            raise TokenExpired
+        except pyjwt.InvalidTokenError:
+            raise InvalidToken
+
+    return decode
+
+
+_BACKENDS = {
+    "jose": lambda: _decode_jose,
+    "pyjwt": _pyjwt_decoder,
+}
+if settings.AUTH_JWT_BACKEND not in _BACKENDS:
+    raise ValueError(f"Unsupported AUTH_JWT_BACKEND: {settings.AUTH_JWT_BACKEND}")
+decode_uncached = _BACKENDS[settings.AUTH_JWT_BACKEND]()
+
+
+def decode(token: str) -> dict:
+    """
+    Проверенные claims токена. Возвращаемый dict общий для всех запросов с этим
+    токеном - его нельзя изменять
+    """
+    key = hashlib.blake2b(token.encode(), digest_size=16).digest()
+    payload = verified_tokens.get(key)
+    if payload is not None:
+        return payload
+
+    payload = decode_uncached(token)
+    exp = payload.get("exp")
+    if isinstance(exp, (int, float)):
+        ttl = exp - time.time()
+        if ttl > 0:
+            verified_tokens.set(key, payload, ttl=ttl)
+    return payload
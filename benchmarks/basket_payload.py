@@ -0,0 +1,56 @@
+"""
+Размер и латентность ответа корзины на 50 позиций: view=full против view=summary.
+
+Нужна БД, заполненная benchmarks.seed. Корзина первого пользователя seed
+заменяется на ITEMS позиций, затем корзина запрашивается в обоих представлениях:
+
+    python -m benchmarks.basket_payload --items 50 --repeat 200
+"""
+import argparse
+import asyncio
+import gzip
+
+from benchmarks.load import Recorder, make_client, load_product_ids
+from benchmarks.report import print_table
+from benchmarks.seed import PASSWORD, bench_email
+
+
+async def main(args):
+    recorder = Recorder()
+    async with make_client(args.base_url) as client:
+        email = bench_email(0)
+        response = await client.post("/user/login", json={"username": email, "email": email, "password": PASSWORD})
+        response.raise_for_status()
+        headers = {"Authorization": f"Bearer {response.json()['auth_token']}"}
+
+        product_ids = (await load_product_ids(client))[:args.items]
+        await client.post("/app/basket/", headers=headers, params={"view": "summary"})
+        response = await client.put(
+            "/app/basket/items:bulk",
+            headers=headers,
+            params={"view": "summary"},
+            json=[{"product_id": product_id, "quantity": 1} for product_id in product_ids],
+        )
+        response.raise_for_status()
+
+        sizes = {}
+        for view in ("full", "summary"):
+            for _ in range(args.repeat):
+                response = await recorder.request(
+                    client, f"basket view={view}", "POST", "/app/basket/", headers=headers, params={"view": view}
+                )
+            body = response.content
+            sizes[view] = (len(body), len(gzip.compress(body)))
+
+    print_table(recorder.operations(duration=0))
+    print()
+    for view, (raw, compressed) in sizes.items():
+        print(f"view={view:<8} {raw:>8} bytes, {compressed:>7} bytes gzip")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--items", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--base-url", help="адрес запущенного uvicorn вместо прогона в процессе")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,60 @@
+"""
+Стоимость проверки JWT на запрос при 1k и 10k одновременных сессий:
+jose с разбором ключа на каждый вызов (как было), jose с заранее
+подготовленным ключом и кэш проверенных токенов.
+
+БД не нужна, нужны KEY и ALGORITHM из .env:
+
+    python -m benchmarks.jwt_decode --requests 100000
+    AUTH_JWT_BACKEND=pyjwt python -m benchmarks.jwt_decode
+"""
+import argparse
+import random
+import time
+
+from jose import jwt
+
+from app.config import settings
+from app.user.auth import create_access_token
+from app.user.tokens import decode, decode_uncached, verified_tokens
+
+
+def old_decode(token: str) -> dict:
+    return jwt.decode(token, settings.KEY, algorithms=[settings.ALGORITHM])
+
+
+def measure(label: str, func, tokens: list[str], requests: int, seed: int):
+    rng = random.Random(seed)
+    sequence = [rng.choice(tokens) for _ in range(requests)]
+    started = time.perf_counter()
+    for token in sequence:
+        func(token)
+    elapsed = time.perf_counter() - started
+    print(f"{label:<34} {elapsed / requests * 1e6:8.2f} us/request")
+
+
+def main(args):
+    print(f"backend: {settings.AUTH_JWT_BACKEND}, algorithm: {settings.ALGORITHM}, "
+          f"cache size: {settings.AUTH_TOKEN_CACHE_SIZE}")
+    for sessions in args.sessions:
+        tokens = [
+            create_access_token(user_id, 0, name=f"user {user_id}", email=f"user{user_id}@example.com")
+            for user_id in range(sessions)
+        ]
+        print(f"\n{sessions} sessions, {args.requests} requests")
+        measure("jose, key parsed per call", old_decode, tokens, args.requests, args.seed)
+        measure(f"{settings.AUTH_JWT_BACKEND}, prepared key", decode_uncached, tokens, args.requests, args.seed)
+
+        verified_tokens.clear()
+        verified_tokens.hits = verified_tokens.misses = 0
+        measure("verified-token cache", decode, tokens, args.requests, args.seed)
+        stats = verified_tokens.stats()
+        print(f"{'cache hit rate':<34} {stats['hits'] / max(stats['hits'] + stats['misses'], 1):8.1%}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sessions", type=int, nargs="+", default=[1000, 10000])
+    parser.add_argument("--requests", type=int, default=50000)
+    parser.add_argument("--seed", type=int, default=42)
+    main(parser.parse_args())
@@ -0,0 +1,247 @@
+"""
+Нагрузочный прогон смешанного профиля: просмотр каталога, добавление в корзину,
+оформление заказа и логин. Сначала заполните БД:
+
+    python -m benchmarks.seed --users 200 --products 5000
+    python -m benchmarks.load --users 50 --duration 30 --output benchmarks/results/before.json
+    python -m benchmarks.report benchmarks/results/before.json benchmarks/results/after.json
+
+По умолчанию приложение крутится в этом же процессе через ASGITransport. С --base-url
+нагрузка идёт на запущенный uvicorn; для числа SQL-запросов его нужно запускать с
+SQL_SERVER_TIMING=true - оно берётся из заголовка Server-Timing.
+
+Все виртуальные пользователи ходят с одного адреса, поэтому лимит попыток входа
+в прогоне выключен (RATE_LIMIT_ENABLED=false); запущенный uvicorn тоже нужно стартовать
+с ним. Если лимит всё же сработал, ответы 429 считаются отдельно от ошибок и прогон
+предупреждает, что сравнивать его с другими нельзя.
+"""
+import os
+
+# Настройки читаются при импорте app, поэтому включаем Server-Timing до него
+os.environ.setdefault("SQL_INSTRUMENTATION", "true")
+os.environ.setdefault("SQL_SERVER_TIMING", "true")
+os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+
+import argparse
+import asyncio
+import json
+import random
+import re
+import subprocess
+import time
+from collections import Counter, defaultdict
+from datetime import datetime, timezone
+
+import httpx
+
+from benchmarks.report import print_table, summarize
+from benchmarks.seed import PASSWORD, bench_email
+
+STATEMENTS_RE = re.compile(r"db-statements;desc=(\d+)")
+DEFAULT_MIX = "browse=70,basket=20,checkout=5,login=5"
+
+
+class Recorder:
+    """
+    Латентность, ошибки и число SQL-запросов по каждой операции
+    """
+
+    def __init__(self):
+        self.latencies: dict[str, list[float]] = defaultdict(list)
+        self.statements: dict[str, list[int]] = defaultdict(list)
+        self.errors: Counter = Counter()
+        # Ответы лимитера не ошибки приложения: считаем их отдельно
+        self.rate_limited: Counter = Counter()
+
+    async def request(self, client: httpx.AsyncClient, name: str, method: str, url: str, **kwargs):
+        started = time.perf_counter()
+        try:
+            response = await client.request(method, url, **kwargs)
+        except httpx.HTTPError:
+            self.latencies[name].append(time.perf_counter() - started)
+            self.errors[name] += 1
+            return None
+        self.latencies[name].append(time.perf_counter() - started)
+        if response.status_code == 429:
+            self.rate_limited[name] += 1
+        elif response.status_code >= 400:
+            self.errors[name] += 1
+        match = STATEMENTS_RE.search(response.headers.get("server-timing", ""))
+        if match:
+            self.statements[name].append(int(match.group(1)))
+        return response
+
+    def operations(self, duration: float) -> dict[str, dict]:
+        return {
+            name: summarize(latencies, self.statements[name], self.errors[name], duration)
+            for name, latencies in sorted(self.latencies.items())
+        }
+
+    def total(self, duration: float) -> dict:
+        return summarize(
+            [value for values in self.latencies.values() for value in values],
+            [value for values in self.statements.values() for value in values],
+            sum(self.errors.values()),
+            duration,
+        )
+
+
+class VirtualUser:
+
+    def __init__(self, index: int, email: str, rng: random.Random, product_ids: list[int]):
+        self.index = index
+        self.email = email
+        self.rng = rng
+        self.product_ids = product_ids
+        self.headers: dict[str, str] = {}
+
+    def login_body(self) -> dict:
+        return {"username": self.email, "email": self.email, "password": PASSWORD}
+
+
+async def login(client, recorder: Recorder, user: VirtualUser):
+    response = await recorder.request(client, "login", "POST", "/user/login", json=user.login_body())
+    if response is not None and response.status_code == 200:
+        user.headers = {"Authorization": f"Bearer {response.json()['auth_token']}"}
+
+
+async def browse(client, recorder: Recorder, user: VirtualUser):
+    page = user.rng.randint(1, 20)
+    response = await recorder.request(
+        client, "list_products", "GET", "/app/product/", params={"page": page, "limit": 20}
+    )
+    if response is not None and response.status_code == 200:
+        ids = [product["id"] for product in response.json()["data"]]
+        if ids:
+            await recorder.request(client, "get_product", "GET", f"/app/product/{user.rng.choice(ids)}")
+
+
+async def add_to_basket(client, recorder: Recorder, user: VirtualUser):
+    response = await recorder.request(client, "open_basket", "POST", "/app/basket/", headers=user.headers)
+    if response is None or response.status_code != 201:
+        return
+    # price обязателен в схеме, но сервер берёт цену из products
+    await recorder.request(
+        client, "add_item", "POST", "/app/basket/items", headers=user.headers,
+        json={
+            "product_id": user.rng.choice(user.product_ids),
+            "basket_id": response.json()["id"],
+            "quantity": 1,
+            "price": "0",
+        },
+    )
+
+
+async def checkout(client, recorder: Recorder, user: VirtualUser):
+    await add_to_basket(client, recorder, user)
+    await recorder.request(client, "checkout", "PUT", "/app/basket/checkout", headers=user.headers)
+
+
+SCENARIOS = {
+    "browse": browse,
+    "basket": add_to_basket,
+    "checkout": checkout,
+    "login": login,
+}
+
+
+def parse_mix(value: str) -> dict[str, int]:
+    mix = {}
+    for part in value.split(","):
+        name, _, weight = part.partition("=")
+        if name.strip() not in SCENARIOS:
+            raise argparse.ArgumentTypeError(f"Unknown scenario {name!r}, expected one of {', '.join(SCENARIOS)}")
+        mix[name.strip()] = int(weight)
+    return mix
+
+
+async def run_user(client, recorder: Recorder, user: VirtualUser, mix: dict[str, int], deadline: float, counts: Counter):
+    await login(client, recorder, user)
+    names, weights = list(mix), list(mix.values())
+    while time.perf_counter() < deadline:
+        name = user.rng.choices(names, weights)[0]
+        counts[name] += 1
+        await SCENARIOS[name](client, recorder, user)
+
+
+async def load_product_ids(client) -> list[int]:
+    ids = []
+    for page in range(1, 6):
+        response = await client.get("/app/product/", params={"page": page, "limit": 100, "count_mode": "none"})
+        response.raise_for_status()
+        ids += [product["id"] for product in response.json()["data"]]
+    if not ids:
+        raise SystemExit("Catalog is empty, run `python -m benchmarks.seed` first")
+    return ids
+
+
+def make_client(base_url: str | None) -> httpx.AsyncClient:
+    if base_url:
+        return httpx.AsyncClient(base_url=base_url, timeout=30)
+    from app.main import app
+
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench", timeout=30)
+
+
+def git_revision() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def main(args):
+    recorder = Recorder()
+    counts: Counter = Counter()
+    async with make_client(args.base_url) as client:
+        product_ids = await load_product_ids(client)
+        users = [
+            VirtualUser(i, bench_email(i % args.seeded_users), random.Random(args.seed + i), product_ids)
+            for i in range(args.users)
+        ]
+        started = time.perf_counter()
+        deadline = started + args.duration
+        await asyncio.gather(*(run_user(client, recorder, user, args.mix, deadline, counts) for user in users))
+        duration = time.perf_counter() - started
+
+    result = {
+        "meta": {
+            "started_at": datetime.now(timezone.utc).isoformat(),
+            "revision": git_revision(),
+            "target": args.base_url or "in-process",
+            "users": args.users,
+            "duration": round(duration, 2),
+            "mix": args.mix,
+            "seed": args.seed,
+        },
+        "scenarios": dict(counts),
+        "rate_limited": dict(recorder.rate_limited),
+        "total": recorder.total(duration),
+        "operations": recorder.operations(duration),
+    }
+
+    print_table({**result["operations"], "TOTAL": result["total"]})
+    if recorder.rate_limited:
+        print(
+            f"warning: {sum(recorder.rate_limited.values())} requests got 429 from the rate limiter, "
+            "start the server with RATE_LIMIT_ENABLED=false to compare runs"
+        )
+    if args.output:
+        os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+        with open(args.output, "w") as f:
+            json.dump(result, f, indent=2)
+        print(f"saved to {args.output}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=20, help="одновременных виртуальных пользователей")
+    parser.add_argument("--seeded-users", type=int, default=200, help="сколько пользователей создал seed")
+    parser.add_argument("--duration", type=float, default=30, help="секунд нагрузки")
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix(DEFAULT_MIX), help=f"веса сценариев, {DEFAULT_MIX}")
+    parser.add_argument("--base-url", help="адрес запущенного uvicorn вместо прогона в процессе")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="куда сохранить JSON с результатами")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,74 @@
+"""
+Латентность GET /app/product/ во время шторма логинов.
+
+Нужна рабочая БД из .env и существующий пользователь:
+
+    AUTH_HASH_EXECUTOR=inline python -m benchmarks.login_storm --email a@b.c --password secret
+    AUTH_HASH_EXECUTOR=thread python -m benchmarks.login_storm --email a@b.c --password secret
+
+Первый запуск - старое поведение (bcrypt в event loop), второй - пул потоков.
+Шторм идёт одним email с одного адреса, поэтому лимит попыток входа выключен
+(RATE_LIMIT_ENABLED=false), иначе почти все логины получили бы 429 без bcrypt.
+"""
+import os
+
+# Настройки читаются при импорте app
+os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+
+import argparse
+import asyncio
+import statistics
+import time
+from collections import Counter
+
+import httpx
+
+from app.main import app
+from benchmarks.report import percentile
+
+
+async def login_worker(
+    client: httpx.AsyncClient, email: str, password: str, statuses: Counter, stop: asyncio.Event
+):
+    while not stop.is_set():
+        response = await client.post("/user/login", json={"username": email, "email": email, "password": password})
+        statuses[response.status_code] += 1
+
+
+async def browse_worker(client: httpx.AsyncClient, latencies: list[float], stop: asyncio.Event):
+    while not stop.is_set():
+        started = time.perf_counter()
+        await client.get("/app/product/", params={"limit": 10})
+        latencies.append(time.perf_counter() - started)
+        await asyncio.sleep(0.01)
+
+
+async def main(args):
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        stop = asyncio.Event()
+        latencies: list[float] = []
+        statuses: Counter = Counter()
+        tasks = [
+            asyncio.create_task(login_worker(client, args.email, args.password, statuses, stop))
+            for _ in range(args.logins)
+        ]
+        tasks += [asyncio.create_task(browse_worker(client, latencies, stop)) for _ in range(args.browsers)]
+        await asyncio.sleep(args.duration)
+        stop.set()
+        await asyncio.gather(*tasks)
+
+    print(f"logins by status: {dict(sorted(statuses.items()))}")
+    print(f"requests: {len(latencies)}")
+    print(f"p50: {statistics.median(latencies) * 1000:.1f} ms")
+    print(f"p99: {percentile(latencies, 99) * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--email", required=True)
+    parser.add_argument("--password", required=True)
+    parser.add_argument("--logins", type=int, default=20, help="параллельных логинов")
+    parser.add_argument("--browsers", type=int, default=5, help="параллельных читателей каталога")
+    parser.add_argument("--duration", type=float, default=10)
+    asyncio.run(main(parser.parse_args()))
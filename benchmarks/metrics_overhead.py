@@ -0,0 +1,58 @@
+"""
+Накладные расходы PrometheusMiddleware на один запрос.
+
+БД не нужна: два одинаковых приложения с пустым обработчиком, с middleware и без:
+
+    python -m benchmarks.metrics_overhead --requests 20000
+"""
+import argparse
+import asyncio
+import time
+
+import httpx
+from fastapi import FastAPI
+
+from app.metrics import PrometheusMiddleware, registry
+
+
+def build_app(with_metrics: bool) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/items/{item_id}")
+    async def item(item_id: int):
+        return {"id": item_id}
+
+    if with_metrics:
+        app.add_middleware(PrometheusMiddleware)
+    return app
+
+
+async def measure(app: FastAPI, requests: int) -> float:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        # Прогрев: сборка middleware-стека и первые аллокации
+        for i in range(100):
+            await client.get(f"/items/{i}")
+        started = time.perf_counter()
+        for i in range(requests):
+            await client.get(f"/items/{i}")
+        return time.perf_counter() - started
+
+
+async def main(args):
+    plain = await measure(build_app(False), args.requests)
+    instrumented = await measure(build_app(True), args.requests)
+
+    print(f"without middleware: {plain / args.requests * 1e6:.1f} us/request")
+    print(f"with middleware:    {instrumented / args.requests * 1e6:.1f} us/request")
+    print(f"overhead: {(instrumented - plain) / plain * 100:.1f}%")
+
+    started = time.perf_counter()
+    body = registry.render()
+    print(f"render /metrics: {(time.perf_counter() - started) * 1000:.2f} ms, {len(body)} bytes")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=10000)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,79 @@
+"""
+Накладные расходы лимитера попыток входа на один запрос.
+
+БД не нужна: приложение с пустым POST /login, принимающим JSON с email,
+с зависимостью rate_limit и без. Плюс чистая стоимость LocalRateLimitStore.hit
+и поведение памяти при наплыве уникальных ключей:
+
+    python -m benchmarks.rate_limit --requests 20000
+"""
+import argparse
+import asyncio
+import time
+
+import httpx
+from fastapi import Depends, FastAPI
+from pydantic import BaseModel
+
+from app.config import settings
+from app.ratelimit import LocalRateLimitStore, rate_limit
+
+
+class Credentials(BaseModel):
+    email: str
+    password: str
+
+
+def build_app(with_limit: bool) -> FastAPI:
+    app = FastAPI()
+    dependencies = [Depends(rate_limit("bench"))] if with_limit else []
+
+    @app.post("/login", dependencies=dependencies)
+    async def login(data: Credentials):
+        return {"email": data.email}
+
+    return app
+
+
+async def measure(app: FastAPI, requests: int) -> float:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for i in range(100):
+            await client.post("/login", json={"email": f"warmup{i}@example.com", "password": "x"})
+        started = time.perf_counter()
+        for i in range(requests):
+            # Разные email, чтобы лимит не срабатывал и мерилась именно проверка
+            await client.post("/login", json={"email": f"user{i}@example.com", "password": "x"})
+        return time.perf_counter() - started
+
+
+async def measure_store(keys: int, calls: int, maxsize: int) -> tuple[float, int]:
+    store = LocalRateLimitStore(maxsize=maxsize)
+    started = time.perf_counter()
+    for i in range(calls):
+        n = i % keys
+        await store.hit(f"login:ip:10.{n >> 16 & 255}.{n >> 8 & 255}.{n & 255}", 1_000_000, 60)
+    return time.perf_counter() - started, len(store)
+
+
+async def main(args):
+    # Лимит по IP выше числа запросов: все запросы бенчмарка приходят с одного адреса
+    settings.RATE_LIMIT_IP = args.requests * 10
+    plain = await measure(build_app(False), args.requests)
+    limited = await measure(build_app(True), args.requests)
+
+    print(f"without limiter: {plain / args.requests * 1e6:.1f} us/request")
+    print(f"with limiter:    {limited / args.requests * 1e6:.1f} us/request")
+    print(f"overhead: {(limited - plain) / args.requests * 1e6:.1f} us/request")
+
+    for keys in (1, 1000, args.keys):
+        elapsed, size = await measure_store(keys, args.requests, args.maxsize)
+        print(f"store.hit, {keys} keys: {elapsed / args.requests * 1e6:.2f} us/call, {size} keys kept")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=10000)
+    parser.add_argument("--keys", type=int, default=1_000_000, help="уникальных ключей при наплыве")
+    parser.add_argument("--maxsize", type=int, default=10000)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,87 @@
+"""
+Сводка и сравнение результатов нагрузочных прогонов.
+
+    python -m benchmarks.report results/before.json results/after.json --threshold 10
+
+Код выхода 1, если p95 какой-то операции вырос больше порога (в процентах)
+или в среднем стало больше SQL-запросов на HTTP-запрос.
+"""
+import argparse
+import json
+import sys
+
+
+def percentile(values: list[float], p: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    index = min(len(values) - 1, int(round(p / 100 * (len(values) - 1))))
+    return values[index]
+
+
+def summarize(latencies: list[float], statements: list[int], errors: int, duration: float) -> dict:
+    """
+    latencies - секунды, statements - число SQL-запросов из Server-Timing по каждому ответу
+    """
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "throughput_rps": round(len(latencies) / duration, 2) if duration else 0.0,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+        "statements_per_request": round(sum(statements) / len(statements), 2) if statements else None,
+    }
+
+
+def print_table(operations: dict[str, dict]):
+    print(f"{'operation':<22} {'req':>7} {'err':>5} {'rps':>9} {'p50':>9} {'p95':>9} {'p99':>9} {'sql/req':>8}")
+    for name, stats in operations.items():
+        sql = stats["statements_per_request"]
+        print(
+            f"{name:<22} {stats['requests']:>7} {stats['errors']:>5} {stats['throughput_rps']:>9.1f} "
+            f"{stats['p50_ms']:>9.1f} {stats['p95_ms']:>9.1f} {stats['p99_ms']:>9.1f} "
+            f"{'-' if sql is None else sql:>8}"
+        )
+
+
+def compare(baseline: dict, current: dict, threshold: float) -> list[str]:
+    """
+    Печатает разницу по операциям и возвращает список регрессий
+    """
+    regressions = []
+    print(f"{'operation':<22} {'p95 before':>11} {'p95 after':>11} {'change':>8} {'sql before':>11} {'sql after':>10}")
+    for name, after in current["operations"].items():
+        before = baseline["operations"].get(name)
+        if before is None:
+            continue
+        change = (after["p95_ms"] - before["p95_ms"]) / before["p95_ms"] * 100 if before["p95_ms"] else 0.0
+        print(
+            f"{name:<22} {before['p95_ms']:>11.1f} {after['p95_ms']:>11.1f} {change:>+7.1f}% "
+            f"{str(before['statements_per_request']):>11} {str(after['statements_per_request']):>10}"
+        )
+        if change > threshold:
+            regressions.append(f"{name}: p95 {before['p95_ms']} -> {after['p95_ms']} ms")
+        if (before["statements_per_request"] or 0) < (after["statements_per_request"] or 0):
+            regressions.append(
+                f"{name}: statements {before['statements_per_request']} -> {after['statements_per_request']}"
+            )
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("baseline")
+    parser.add_argument("current")
+    parser.add_argument("--threshold", type=float, default=10, help="допустимый рост p95, %%")
+    args = parser.parse_args()
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.current) as f:
+        current = json.load(f)
+
+    regressions = compare(baseline, current, args.threshold)
+    for regression in regressions:
+        print(f"REGRESSION {regression}")
+    sys.exit(1 if regressions else 0)
@@ -0,0 +1,85 @@
+"""
+Поштучные методы BaseRepository против пакетных (get_many/create_many/update_many/delete_many).
+
+Нужна рабочая БД из .env. Все изменения откатываются в конце:
+
+    python -m benchmarks.repository_batch --rows 1000
+"""
+import argparse
+import asyncio
+import time
+from decimal import Decimal
+
+import app.models  # noqa: F401 - регистрируем все модели до первого запроса
+from app.database import async_session, request_session
+from app.product.repository import ProductRepository
+
+
+def product_rows(count: int, prefix: str) -> list[dict]:
+    return [
+        {
+            "name": f"{prefix} {i}",
+            "price": Decimal("9.99"),
+            "description": "benchmark",
+            "quantity": 10,
+            "product_image": "",
+        }
+        for i in range(count)
+    ]
+
+
+async def timed(label: str, coro):
+    started = time.perf_counter()
+    result = await coro
+    print(f"{label:<28} {(time.perf_counter() - started) * 1000:9.1f} ms")
+    return result
+
+
+async def _get_each(ids, session):
+    for id in ids:
+        await ProductRepository.get_by_id(id, session=session)
+
+
+async def _update_each(ids, session):
+    for id in ids:
+        await ProductRepository.update(id, {"quantity": 5}, session=session)
+
+
+async def _destroy_each(ids, session):
+    for id in ids:
+        await ProductRepository.destroy(id, session)
+
+
+async def batched(rows: list[dict], session):
+    created = await timed("create_many", ProductRepository.create_many(rows, session=session))
+    ids = [product.id for product in created]
+    await timed("get_many", ProductRepository.get_many(ids, session=session))
+    await timed("update_many", ProductRepository.update_many([{"id": id, "quantity": 5} for id in ids], session=session))
+    await timed("delete_many", ProductRepository.delete_many(ids, session=session))
+
+
+async def main(args):
+    async with async_session() as session:
+        # Сессия как в запросе: записи только flush, в конце всё откатываем
+        token = request_session.set(session)
+        try:
+            print(f"rows: {args.rows}")
+            rows = product_rows(args.rows, "per-row")
+            started = time.perf_counter()
+            created = [await ProductRepository.create(session=session, **row) for row in rows]
+            print(f"{'create x N':<28} {(time.perf_counter() - started) * 1000:9.1f} ms")
+            ids = [product.id for product in created]
+            await timed("get_by_id x N", _get_each(ids, session))
+            await timed("update x N", _update_each(ids, session))
+            await timed("destroy x N", _destroy_each(ids, session))
+
+            await batched(product_rows(args.rows, "batch"), session)
+        finally:
+            request_session.reset(token)
+            await session.rollback()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1000)
+    asyncio.run(main(parser.parse_args()))
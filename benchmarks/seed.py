@@ -0,0 +1,109 @@
+"""
+Воспроизводимый набор данных для нагрузочных прогонов.
+
+Нужна рабочая PostgreSQL из .env с применёнными миграциями. SQLite не подходит:
+репозитории используют ANY(array), ON CONFLICT, tsvector и pg_trgm.
+
+    python -m benchmarks.seed --users 200 --products 5000 --baskets 100
+    python -m benchmarks.seed --reset   # только удалить данные бенчмарка
+
+Все пользователи - bench<N>@example.com с паролем PASSWORD, все товары - артикулы
+BENCH-<N> с большим остатком, чтобы оформление заказа не упиралось в склад.
+"""
+import argparse
+import asyncio
+import random
+from decimal import Decimal
+
+from sqlalchemy import delete, insert
+
+import app.models  # noqa: F401 - регистрируем все модели до первого запроса
+from app.database import async_session
+from app.product.models import Basket, BasketItem, Product
+from app.product.repository import BasketRepository
+from app.user.auth import get_hashed_password
+from app.user.models import User
+
+PASSWORD = "bench-password"
+EMAIL_TEMPLATE = "bench{}@example.com"
+SKU_PREFIX = "BENCH-"
+STOCK = 1_000_000
+BATCH_SIZE = 1000
+
+
+def bench_email(index: int) -> str:
+    return EMAIL_TEMPLATE.format(index)
+
+
+async def reset(session):
+    # Корзины и позиции удаляются каскадом вместе с пользователями
+    await session.execute(delete(User).where(User.email.like(EMAIL_TEMPLATE.format("%"))))
+    await session.execute(delete(Product).where(Product.sku.like(f"{SKU_PREFIX}%")))
+
+
+async def insert_batches(session, model, rows: list[dict], *returning) -> list:
+    """
+    Core INSERT пачками по BATCH_SIZE, возвращает строки RETURNING в порядке вставки
+    """
+    inserted = []
+    for start in range(0, len(rows), BATCH_SIZE):
+        result = await session.execute(
+            insert(model).returning(model.id, *returning, sort_by_parameter_order=True),
+            rows[start:start + BATCH_SIZE],
+        )
+        inserted += result.all()
+    return inserted
+
+
+async def seed(args):
+    rng = random.Random(args.seed)
+    # Один хэш на всех: bcrypt на каждого пользователя занял бы минуты
+    hashed_password = get_hashed_password(PASSWORD)
+
+    async with async_session() as session:
+        await reset(session)
+        if args.reset:
+            await session.commit()
+            return
+
+        users = await insert_batches(session, User, [
+            {"name": f"Bench user {i}", "email": bench_email(i), "hashed_password": hashed_password}
+            for i in range(args.users)
+        ])
+        products = await insert_batches(session, Product, [
+            {
+                "sku": f"{SKU_PREFIX}{i:06d}",
+                "name": f"Bench product {i} {rng.choice(('rose', 'tulip', 'lily', 'orchid', 'peony'))}",
+                "price": Decimal(rng.randint(100, 100_000)) / 100,
+                "description": "benchmark",
+                "quantity": STOCK,
+                "product_image": "",
+            }
+            for i in range(args.products)
+        ], Product.price)
+
+        baskets = await insert_batches(session, Basket, [
+            {"user_id": user.id, "active_status": True, "total_price": 0}
+            for user in users[:args.baskets]
+        ])
+        items = [
+            {"basket_id": basket.id, "product_id": product.id, "price": product.price, "quantity": rng.randint(1, 3)}
+            for basket in baskets
+            for product in rng.sample(products, min(len(products), rng.randint(1, args.items)))
+        ]
+        await insert_batches(session, BasketItem, items)
+        # Суммы корзин считаем в SQL тем же запросом, что и maintenance; он же коммитит
+        await BasketRepository.recompute_all_totals(session=session)
+
+    print(f"users: {len(users)}, products: {len(products)}, baskets: {len(baskets)}, items: {len(items)}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--products", type=int, default=5000)
+    parser.add_argument("--baskets", type=int, default=100, help="активных корзин у первых пользователей")
+    parser.add_argument("--items", type=int, default=5, help="максимум позиций в корзине")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--reset", action="store_true", help="только удалить данные бенчмарка")
+    asyncio.run(seed(parser.parse_args()))
@@ -0,0 +1,113 @@
+"""
+Стоимость сериализации ответа: старый путь (from_orm на каждый элемент, повторная
+валидация по response_model, jsonable_encoder и json.dumps) против новой валидации
+всей страницы из ORM один раз и сериализации pydantic-core сразу в байты.
+
+БД не нужна, строки ORM заменены простыми объектами с атрибутами:
+
+    python -m benchmarks.serialization --repeat 2000
+"""
+import argparse
+import json
+import timeit
+from datetime import datetime
+from decimal import Decimal
+from types import SimpleNamespace
+
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+
+from app.product.schemas import SRBasket, SRBasketItem, SRProduct, SRProductPage
+from app.repository.schemas import SBaseListResponse
+from app.responses import ORJSONResponse
+
+
+def make_product(i: int) -> SimpleNamespace:
+    return SimpleNamespace(
+        id=i, name=f"Product {i}", price=Decimal("19.99"), description="description " * 10,
+        quantity=100, product_image=f"/media/{i}.jpg", sku=f"SKU-{i:06d}",
+    )
+
+
+def make_basket(items: int) -> SimpleNamespace:
+    return SimpleNamespace(
+        id=1, created_at=datetime(2024, 1, 1), total_price=Decimal("999.50"), active_status=True,
+        basket_items=[
+            SimpleNamespace(id=i, price=Decimal("19.99"), quantity=2, product=make_product(i))
+            for i in range(items)
+        ],
+    )
+
+
+USER = {"id": 1, "name": "Bench", "email": "bench@example.com"}
+
+
+def old_page(products: list) -> bytes:
+    # Как было: SRProduct.from_orm в роуте, затем FastAPI валидирует и кодирует результат
+    data = SBaseListResponse(page=1, total=1000, limit=len(products), data=[SRProduct.from_orm(p) for p in products])
+    return json.dumps(jsonable_encoder(data)).encode()
+
+
+def new_page(products: list) -> bytes:
+    data = SRProductPage.model_validate(
+        {"page": 1, "total": 1000, "limit": len(products), "data": products}, from_attributes=True
+    )
+    return data.__pydantic_serializer__.to_json(data)
+
+
+PRODUCT_LIST = TypeAdapter(list[SRProduct])
+
+
+def adapter_page(products: list) -> bytes:
+    return PRODUCT_LIST.dump_json(PRODUCT_LIST.validate_python(products, from_attributes=True))
+
+
+def old_basket(basket) -> bytes:
+    data = SRBasket(
+        id=basket.id, created_at=basket.created_at, total_price=basket.total_price,
+        active_status=basket.active_status,
+        basket_items=[SRBasketItem.from_orm(item) for item in basket.basket_items], user=USER,
+    )
+    # FastAPI заново валидирует модель по response_model перед кодированием
+    data = SRBasket.model_validate(data.model_dump())
+    return json.dumps(jsonable_encoder(data)).encode()
+
+
+def new_basket(basket) -> bytes:
+    data = SRBasket.model_validate(
+        {
+            "id": basket.id, "created_at": basket.created_at, "total_price": basket.total_price,
+            "active_status": basket.active_status, "basket_items": basket.basket_items, "user": USER,
+        },
+        from_attributes=True,
+    )
+    return data.__pydantic_serializer__.to_json(data)
+
+
+def dict_response(payload: dict) -> bytes:
+    return ORJSONResponse(payload).body
+
+
+def report(label: str, func, arg, repeat: int):
+    seconds = min(timeit.repeat(lambda: func(arg), number=repeat, repeat=3)) / repeat
+    print(f"{label:<36} {seconds * 1e6:9.1f} us   {len(func(arg)):>7} bytes")
+
+
+def main(args):
+    products = [make_product(i) for i in range(args.products)]
+    basket = make_basket(args.items)
+    report(f"page of {args.products}: old", old_page, products, args.repeat)
+    report(f"page of {args.products}: new", new_page, products, args.repeat)
+    report(f"page of {args.products}: TypeAdapter", adapter_page, products, args.repeat)
+    report(f"basket of {args.items}: old", old_basket, basket, args.repeat)
+    report(f"basket of {args.items}: new", new_basket, basket, args.repeat)
+    report("dict via json", lambda payload: json.dumps(jsonable_encoder(payload)).encode(), USER, args.repeat)
+    report("dict via orjson", dict_response, USER, args.repeat)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--products", type=int, default=100)
+    parser.add_argument("--items", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=1000)
+    main(parser.parse_args())
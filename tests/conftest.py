@@ -0,0 +1,102 @@
+"""
+Тесты ходят в настоящий PostgreSQL из настроек приложения (.env / DB_*), схема
+накатывается миграциями. Данные не удаляются, поэтому запускать на отдельной базе;
+каждый тест создаёт своих пользователей и продукты с уникальными email и sku
+"""
+import os
+from uuid import uuid4
+
+# Все запросы тестов идут с одного адреса - лимитер входа им не нужен
+os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+
+import httpx
+import pytest
+from alembic import command
+from alembic.config import Config
+from sqlalchemy.exc import OperationalError
+
+from app.database import async_session, engine
+from app.main import app
+from app.product.repository import ProductRepository
+from app.user.auth import create_access_token, get_hashed_password
+from app.user.repository import UserRepository
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PASSWORD = "password"
+
+
+@pytest.fixture(scope="session")
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture(scope="session", autouse=True)
+def migrated_database():
+    # Без alembic.ini: его fileConfig отключил бы уже созданные логгеры приложения
+    config = Config()
+    config.set_main_option("script_location", os.path.join(ROOT, "app", "migrations"))
+    try:
+        command.upgrade(config, "head")
+    except (OSError, OperationalError) as e:
+        pytest.skip(f"PostgreSQL is not available: {e}")
+
+
+@pytest.fixture(scope="session")
+def password():
+    return PASSWORD
+
+
+@pytest.fixture(scope="session")
+def hashed_password(password):
+    # bcrypt один раз на прогон, а не на каждого пользователя
+    return get_hashed_password(password)
+
+
+@pytest.fixture
+async def dispose_engine():
+    # Подключения пула привязаны к event loop теста
+    yield
+    await engine.dispose()
+
+
+@pytest.fixture
+async def client(dispose_engine):
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        yield client
+
+
+@pytest.fixture
+def make_user(hashed_password, dispose_engine):
+    """
+    Создаёт пользователя и возвращает заголовки с его access-токеном
+    """
+    async def make():
+        async with async_session() as session:
+            user = await UserRepository.create(
+                session=session,
+                name="Test user",
+                email=f"test-{uuid4().hex}@example.com",
+                hashed_password=hashed_password,
+            )
+        token = create_access_token(user.id, user.token_version)
+        return {"Authorization": f"Bearer {token}"}
+
+    return make
+
+
+@pytest.fixture
+def make_product(dispose_engine):
+    async def make(quantity: int = 10, price: str = "9.99"):
+        async with async_session() as session:
+            return await ProductRepository.create(
+                session=session,
+                sku=f"TEST-{uuid4().hex}",
+                name="Test product",
+                price=price,
+                description="Test product",
+                quantity=quantity,
+                product_image="",
+            )
+
+    return make
@@ -0,0 +1,83 @@
+import asyncio
+
+import pytest
+
+from app.product.repository import ProductRepository
+
+pytestmark = pytest.mark.anyio
+
+STOCK = 3
+BUYERS = 8
+ROUNDS = 5
+
+
+async def fill_basket(client, headers: dict, product_id: int, quantity: int = 1):
+    response = await client.post("/app/basket/", headers=headers)
+    assert response.status_code == 201
+    basket_id = response.json()["id"]
+    response = await client.post(
+        "/app/basket/items",
+        json={"product_id": product_id, "basket_id": basket_id, "quantity": quantity, "price": "0"},
+        headers=headers,
+    )
+    assert response.status_code == 201
+
+
+async def test_parallel_checkouts_never_oversell(client, make_user, make_product):
+    product = await make_product(quantity=STOCK)
+    buyers = [await make_user() for _ in range(BUYERS)]
+    for headers in buyers:
+        await fill_basket(client, headers, product.id)
+
+    responses = await asyncio.gather(*(client.put("/app/basket/checkout", headers=headers) for headers in buyers))
+    statuses = [response.status_code for response in responses]
+
+    assert statuses.count(200) == STOCK
+    assert statuses.count(400) == BUYERS - STOCK
+    product = await ProductRepository.get_by_id(product.id)
+    assert product.quantity == 0
+
+
+async def test_checkout_rolls_back_partially_covered_basket(client, make_user, make_product):
+    enough = await make_product(quantity=5)
+    scarce = await make_product(quantity=1)
+    headers = await make_user()
+    await fill_basket(client, headers, enough.id, quantity=2)
+    await fill_basket(client, headers, scarce.id, quantity=2)
+
+    response = await client.put("/app/basket/checkout", headers=headers)
+
+    assert response.status_code == 400
+    assert response.json()["detail"]["products"] == [
+        {"id": scarce.id, "name": "Test product", "requested": 2, "available": 1}
+    ]
+    # Списание по первой позиции откатилось вместе с запросом
+    assert (await ProductRepository.get_by_id(enough.id)).quantity == 5
+    assert (await ProductRepository.get_by_id(scarce.id)).quantity == 1
+
+
+
+async def refill_basket(client, headers: dict, products: list):
+    response = await client.post("/app/basket/", headers=headers)
+    assert response.status_code == 201
+    response = await client.put(
+        "/app/basket/items:bulk",
+        json=[{"product_id": product.id, "quantity": 1} for product in products],
+        headers=headers,
+    )
+    assert response.status_code == 200
+
+
+async def test_overlapping_baskets_in_opposite_order_do_not_deadlock(client, make_user, make_product):
+    products = [await make_product(quantity=1000) for _ in range(20)]
+    buyers = [await make_user() for _ in range(BUYERS)]
+
+    for _ in range(ROUNDS):
+        for index, headers in enumerate(buyers):
+            # Половина покупателей складывает те же товары в обратном порядке
+            await refill_basket(client, headers, products if index % 2 else products[::-1])
+        responses = await asyncio.gather(*(client.put("/app/basket/checkout", headers=headers) for headers in buyers))
+        assert [response.status_code for response in responses] == [200] * BUYERS
+
+    for product in products:
+        assert (await ProductRepository.get_by_id(product.id)).quantity == 1000 - BUYERS * ROUNDS
@@ -0,0 +1,25 @@
+import pytest
+
+from app.database import after_commit, get_session
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_failing_after_commit_callback_is_logged_and_skipped(dispose_engine, caplog):
+    called = []
+
+    async def broken():
+        raise RuntimeError("cache is down")
+
+    async def invalidate():
+        called.append(True)
+
+    sessions = get_session()
+    session = await anext(sessions)
+    after_commit(session, broken)
+    after_commit(session, invalidate)
+    with pytest.raises(StopAsyncIteration):
+        await anext(sessions)
+
+    assert called == [True]
+    assert "After-commit callback" in caplog.text
@@ -0,0 +1,81 @@
+import io
+
+import pytest
+from PIL import Image
+
+from app.config import settings
+from app.product.cache import invalidate_products
+from app.product.repository import ProductRepository
+
+pytestmark = pytest.mark.anyio
+
+
+def product_data(sku: str, **fields) -> dict:
+    return {
+        "name": "Test product",
+        "price": "9.99",
+        "description": "Test product",
+        "quantity": 10,
+        "product_image": "",
+        "sku": sku,
+        **fields,
+    }
+
+
+async def test_duplicate_sku_is_a_conflict(client, make_user, make_product):
+    headers = await make_user()
+    existing = await make_product()
+    other = await make_product()
+
+    response = await client.post("/app/product/", json=product_data(existing.sku), headers=headers)
+    assert response.status_code == 409
+
+    response = await client.put(f"/app/product/{other.id}", json=product_data(existing.sku), headers=headers)
+    assert response.status_code == 409
+
+
+async def test_list_counts_on_its_own_connection(client, make_product, monkeypatch):
+    monkeypatch.setattr(settings, "SQL_SERVER_TIMING", True)
+    await make_product()
+    # Свежая версия каталога - ответ не из кэша
+    await invalidate_products()
+
+    response = await client.get("/app/product/", params={"limit": 7, "count_mode": "exact"})
+
+    assert response.status_code == 200
+    body = response.json()
+    assert len(body["data"]) == 7
+    assert body["total"] == await ProductRepository.count()
+    # Страница в сессии запроса, count параллельно на втором подключении
+    assert "db-checkouts;desc=2" in response.headers["server-timing"]
+
+
+async def test_list_without_count_uses_one_connection(client, monkeypatch):
+    monkeypatch.setattr(settings, "SQL_SERVER_TIMING", True)
+    await invalidate_products()
+
+    response = await client.get("/app/product/", params={"limit": 7, "count_mode": "none"})
+
+    assert response.status_code == 200
+    assert response.json()["total"] is None
+    assert "db-checkouts;desc=1" in response.headers["server-timing"]
+
+
+async def test_thumbnail_falls_back_to_original_until_built(client, make_user, make_product, tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "MEDIA_ROOT", str(tmp_path))
+    headers = await make_user()
+    product = await make_product()
+    image = io.BytesIO()
+    Image.new("RGB", (800, 600), "red").save(image, "PNG")
+
+    response = await client.post(f"/app/product/{product.id}/image", content=image.getvalue(), headers=headers)
+    assert response.status_code == 201
+    uploaded = response.json()
+    # Ответ уходит до сборки уменьшенных копий
+    assert uploaded["thumbnail"] == uploaded["product_image"]
+
+    # Фоновая задача уже отработала и сбросила кэш карточки
+    response = await client.get(f"/app/product/{product.id}")
+    thumbnail = response.json()["thumbnail"]
+    assert thumbnail.startswith(f"{settings.MEDIA_URL}/products/thumb/")
+    assert thumbnail.endswith(".webp")
@@ -0,0 +1,84 @@
+from uuid import uuid4
+
+import pytest
+from starlette.requests import Request
+
+from app import ratelimit
+from app.config import settings
+from app.ratelimit import LocalRateLimitStore, client_ip
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+def limiter(monkeypatch):
+    """
+    Включённый лимитер со своим пустым хранилищем
+    """
+    monkeypatch.setattr(settings, "RATE_LIMIT_ENABLED", True)
+    monkeypatch.setattr(settings, "RATE_LIMIT_IP", 1000)
+    monkeypatch.setattr(settings, "RATE_LIMIT_EMAIL", 1000)
+    monkeypatch.setattr(ratelimit, "store", LocalRateLimitStore(maxsize=1000))
+
+
+def login_attempt(email: str | None = None) -> dict:
+    return {"username": "Test user", "email": email or f"test-{uuid4().hex}@example.com", "password": "wrong"}
+
+
+def make_request(forwarded: str | None) -> Request:
+    headers = [(b"x-forwarded-for", forwarded.encode())] if forwarded is not None else []
+    return Request({"type": "http", "headers": headers, "client": ("10.0.0.1", 1234)})
+
+
+@pytest.mark.parametrize(
+    "hops, forwarded, expected",
+    [
+        (0, "198.51.100.1, 203.0.113.7", "10.0.0.1"),
+        # Левые записи клиент мог подставить сам
+        (1, "198.51.100.1, 203.0.113.7", "203.0.113.7"),
+        (2, "198.51.100.1, 203.0.113.7, 192.0.2.9", "203.0.113.7"),
+        # Прокси не дописал себя - заголовку не верим
+        (2, "203.0.113.7", "10.0.0.1"),
+        (1, None, "10.0.0.1"),
+    ],
+)
+def test_client_ip_trusts_only_configured_hops(monkeypatch, hops, forwarded, expected):
+    monkeypatch.setattr(settings, "RATE_LIMIT_TRUSTED_PROXIES", hops)
+    assert client_ip(make_request(forwarded)) == expected
+
+
+async def test_ip_limit_answers_429_with_retry_after(client, limiter, monkeypatch):
+    monkeypatch.setattr(settings, "RATE_LIMIT_IP", 3)
+    for _ in range(3):
+        assert (await client.post("/user/login", json=login_attempt())).status_code == 400
+
+    response = await client.post("/user/login", json=login_attempt())
+    assert response.status_code == 429
+    assert int(response.headers["Retry-After"]) >= 1
+
+
+async def test_email_limit_is_per_email(client, limiter, monkeypatch):
+    monkeypatch.setattr(settings, "RATE_LIMIT_EMAIL", 2)
+    email = f"test-{uuid4().hex}@example.com"
+    for _ in range(2):
+        assert (await client.post("/user/login", json=login_attempt(email))).status_code == 400
+
+    # Регистр и пробелы не дают обойти лимит
+    response = await client.post("/user/login", json=login_attempt(f" {email.upper()} "))
+    assert response.status_code == 429
+    assert "Retry-After" in response.headers
+    assert (await client.post("/user/login", json=login_attempt())).status_code == 400
+
+
+async def test_local_store_evicts_least_recently_used_keys():
+    store = LocalRateLimitStore(maxsize=2)
+    assert await store.hit("a", 1, 60) is None
+    assert await store.hit("b", 1, 60) is None
+    # Повторное обращение к "a" делает вытесняемым "b"
+    assert await store.hit("a", 1, 60) is not None
+    assert await store.hit("c", 1, 60) is None
+
+    assert len(store) == 2
+    assert await store.hit("a", 1, 60) is not None
+    # Счётчик "b" вытеснен и начинается заново
+    assert await store.hit("b", 1, 60) is None
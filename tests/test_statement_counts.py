@@ -0,0 +1,94 @@
+"""
+Число SQL-запросов на эндпоинт: записи без refresh и повторных SELECT после INSERT/UPDATE.
+Пользователь перед замером уже в кэше, так что авторизация запросов не добавляет
+"""
+import pytest
+
+from app.instrumentation import statement_budget
+
+pytestmark = pytest.mark.anyio
+
+PRODUCT = {
+    "name": "Test product",
+    "price": "9.99",
+    "description": "Test product",
+    "quantity": 10,
+    "product_image": "",
+    "sku": None,
+}
+
+
+@pytest.fixture
+async def headers(client, make_user):
+    headers = await make_user()
+    # Прогрев кэша пользователя и версии его токенов
+    response = await client.get("/user/current-user", headers=headers)
+    assert response.status_code == 200
+    return headers
+
+
+@pytest.fixture
+async def basket_id(client, headers):
+    response = await client.post("/app/basket/", headers=headers)
+    assert response.status_code == 201
+    return response.json()["id"]
+
+
+async def test_create_product_is_one_insert(client, headers):
+    with statement_budget(1):
+        response = await client.post("/app/product/", json=PRODUCT, headers=headers)
+    assert response.status_code == 201
+
+
+async def test_update_product_is_one_update(client, headers, make_product):
+    product = await make_product()
+    with statement_budget(1):
+        response = await client.put(
+            f"/app/product/{product.id}", json={**PRODUCT, "name": "Renamed"}, headers=headers
+        )
+    assert response.status_code == 200
+    assert response.json()["name"] == "Renamed"
+
+
+async def test_delete_product_is_one_delete(client, headers, make_product):
+    product = await make_product()
+    with statement_budget(1):
+        response = await client.delete(f"/app/product/{product.id}", headers=headers)
+    assert response.status_code == 200
+
+
+async def test_add_item(client, headers, basket_id, make_product):
+    product = await make_product()
+    item = {"product_id": product.id, "basket_id": basket_id, "quantity": 1, "price": "0"}
+    # Корзина, позиция, продукт, INSERT позиции, UPDATE суммы - без повторного SELECT позиции
+    with statement_budget(5):
+        response = await client.post("/app/basket/items", json=item, headers=headers)
+    assert response.status_code == 201
+    with statement_budget(5):
+        response = await client.post("/app/basket/items", json=item, headers=headers)
+    assert response.json()["quantity"] == 2
+
+
+async def test_set_basket_items(client, headers, basket_id, make_product):
+    first, second = await make_product(), await make_product()
+    items = [{"product_id": first.id, "quantity": 2}, {"product_id": second.id, "quantity": 1}]
+    # id корзины, upsert, удаление лишних, пересчёт суммы и три запроса полной корзины
+    with statement_budget(7):
+        response = await client.put("/app/basket/items:bulk", json=items, headers=headers)
+    assert response.status_code == 200
+    # Сводка грузит корзину с позициями одним запросом
+    with statement_budget(5):
+        response = await client.put("/app/basket/items:bulk?view=summary", json=items[:1], headers=headers)
+    assert response.status_code == 200
+
+
+@pytest.mark.parametrize("size", [3, 50])
+async def test_checkout(client, headers, basket_id, make_product, size):
+    products = [await make_product() for _ in range(size)]
+    items = [{"product_id": product.id, "quantity": 1} for product in products]
+    response = await client.put("/app/basket/items:bulk", json=items, headers=headers)
+    assert response.status_code == 200
+    # Блокировка и списание остатков - по одному запросу независимо от числа позиций
+    with statement_budget(5):
+        response = await client.put("/app/basket/checkout", headers=headers)
+    assert response.status_code == 200
@@ -0,0 +1,78 @@
+import json
+from uuid import uuid4
+
+import pytest
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_import_reports_invalid_utf8_as_error_row(client, make_user):
+    headers = await make_user()
+    prefix = f"TEST-{uuid4().hex}"
+    body = (
+        b"sku,name,price,description,quantity,product_image\n"
+        + f"{prefix}-1,Rose,10.50,Red,5,\n".encode()
+        + f"{prefix}-2,".encode() + b"\xff\xfe" + b",1,x,1,\n"
+        + f"{prefix}-3,Tulip,3,Yellow,7,\n".encode()
+    )
+
+    response = await client.post("/app/product/import?format=csv", content=body, headers=headers)
+
+    assert response.status_code == 200
+    report = response.json()
+    assert report["upserted"] == 2
+    assert report["errors"] == [{"line": 3, "error": "Line is not valid UTF-8"}]
+
+
+async def test_ndjson_import_reports_invalid_utf8_as_error_row(client, make_user):
+    headers = await make_user()
+    sku = f"TEST-{uuid4().hex}"
+    body = (
+        b'{"name": "\xff"}\n'
+        + f'{{"sku": "{sku}", "name": "Rose", "price": 1, "quantity": 1}}\n'.encode()
+    )
+
+    response = await client.post("/app/product/import?format=ndjson", content=body, headers=headers)
+
+    assert response.status_code == 200
+    report = response.json()
+    assert report["upserted"] == 1
+    assert report["errors"] == [{"line": 1, "error": "Line is not valid UTF-8"}]
+
+
+
+@pytest.mark.parametrize(
+    "record, error",
+    [
+        ({"quantity": 1.5}, "quantity must be an integer"),
+        ({"quantity": True}, "quantity must be an integer"),
+        ({"quantity": 2 ** 31}, "quantity is out of range"),
+        ({"sku": "TEST-\x00"}, "sku must not contain NUL characters"),
+        ({"name": "Rose\x00"}, "name must not contain NUL characters"),
+        ({"description": "\x00"}, "description must not contain NUL characters"),
+    ],
+)
+async def test_import_reports_rows_the_database_would_reject(client, make_user, record, error):
+    headers = await make_user()
+    valid = {"sku": f"TEST-{uuid4().hex}", "name": "Rose", "price": 1, "quantity": 1}
+    invalid = {**valid, "sku": f"TEST-{uuid4().hex}", **record}
+    body = f"{json.dumps(invalid)}\n{json.dumps(valid)}\n".encode()
+
+    response = await client.post("/app/product/import?format=ndjson", content=body, headers=headers)
+
+    assert response.status_code == 200
+    report = response.json()
+    assert report["upserted"] == 1
+    assert report["errors"] == [{"line": 1, "error": error}]
+
+
+async def test_export_streams_csv(client, make_user, make_product):
+    headers = await make_user()
+    product = await make_product()
+
+    response = await client.get("/app/product/export?format=csv", headers=headers)
+
+    assert response.status_code == 200
+    lines = response.text.splitlines()
+    assert lines[0] == "id,sku,name,price,description,quantity,product_image"
+    assert any(line.startswith(f"{product.id},{product.sku},") for line in lines)
@@ -0,0 +1,75 @@
+from uuid import uuid4
+
+import pytest
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+async def account(client, password):
+    """
+    Пользователь, вошедший через API: id, email и выданная при входе пара токенов
+    """
+    email = f"test-{uuid4().hex}@example.com"
+    response = await client.post("/user/register", json={"name": "Test user", "email": email, "password": password})
+    assert response.status_code == 201
+    user_id = response.json()["id"]
+
+    response = await client.post("/user/login", json={"username": "Test user", "email": email, "password": password})
+    assert response.status_code == 200
+    tokens = response.json()
+    return {
+        "id": user_id,
+        "email": email,
+        "headers": {"Authorization": f"Bearer {tokens['auth_token']}"},
+        "refresh_token": tokens["refresh_token"],
+    }
+
+
+async def test_logout_revokes_access_token(client, account):
+    assert (await client.get("/user/current-user", headers=account["headers"])).status_code == 200
+
+    response = await client.post("/user/logout", headers=account["headers"])
+    assert response.status_code == 200
+
+    assert (await client.get("/user/current-user", headers=account["headers"])).status_code == 401
+
+
+async def test_password_change_revokes_tokens(client, account):
+    response = await client.put(
+        f"/user/update_user/{account['id']}",
+        json={"name": "Test user", "email": account["email"], "password": "new-password"},
+        headers=account["headers"],
+    )
+    assert response.status_code == 200
+
+    assert (await client.get("/user/current-user", headers=account["headers"])).status_code == 401
+    response = await client.post("/user/refresh", json={"refresh_token": account["refresh_token"]})
+    assert response.status_code == 401
+
+
+async def test_delete_revokes_access_token(client, account):
+    response = await client.delete("/user/", headers=account["headers"])
+    assert response.status_code == 204
+
+    assert (await client.get("/user/current-user", headers=account["headers"])).status_code == 401
+
+
+async def test_refresh_token_is_single_use(client, account):
+    response = await client.post("/user/refresh", json={"refresh_token": account["refresh_token"]})
+    assert response.status_code == 200
+    assert response.json()["refresh_token"] != account["refresh_token"]
+
+    response = await client.post("/user/refresh", json={"refresh_token": account["refresh_token"]})
+    assert response.status_code == 401
+
+
+async def test_token_of_wrong_type_is_rejected(client, account):
+    access_token = account["headers"]["Authorization"].removeprefix("Bearer ")
+
+    response = await client.get(
+        "/user/current-user", headers={"Authorization": f"Bearer {account['refresh_token']}"}
+    )
+    assert response.status_code == 401
+    response = await client.post("/user/refresh", json={"refresh_token": access_token})
+    assert response.status_code == 401